@@ -1,14 +1,80 @@
 import os
+import re
+import csv
+import glob
 import json
+import time
+import hashlib
+import zlib
+import random
+import queue
 import sqlite3
 import smtplib
+import threading
+import unicodedata
+import multiprocessing
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from io import StringIO
 from email.message import EmailMessage
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, abort
+from datetime import datetime, date, timedelta
+from typing import NamedTuple, Callable, Optional
+import click
+from flask import Flask, Response, render_template, request, redirect, url_for, session, abort, g, jsonify, stream_with_context
+from flask import before_render_template, template_rendered
 
 APP_SECRET = os.getenv("APP_SECRET", "dev-secret-change-me")
 DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "enrollment.db"))
 
+# SQLite connection pool / tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))  # seconds SQLite waits on a locked database
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()  # NORMAL is durable enough under WAL
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-16000"))  # negative = KiB (16 MB)
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+# Writes that hit SQLITE_BUSY are retried with exponential backoff
+DB_WRITE_RETRIES = int(os.getenv("DB_WRITE_RETRIES", "5"))
+DB_RETRY_BACKOFF = float(os.getenv("DB_RETRY_BACKOFF", "0.05"))  # seconds, doubled per attempt
+
+# Rows fetched per round-trip when streaming exports
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+
+# Synergy export: rows per chunk handed to a worker process, and how many worker
+# processes transform them (0 = one per CPU, up to 4; 1 = in the request thread)
+SYNERGY_CHUNK_ROWS = int(os.getenv("SYNERGY_CHUNK_ROWS", "2000"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "0"))
+
+# Parquet export (needs pyarrow): rows per row group
+PARQUET_ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", "20000"))
+
+# payload_json storage: "json" (full form), "compact" (drop empty fields and ones
+# already stored as columns) or "zlib" (compact + deflate with a shared dictionary)
+PAYLOAD_STORAGE = os.getenv("PAYLOAD_STORAGE", "json").lower()
+PAYLOAD_ZLIB_LEVEL = int(os.getenv("PAYLOAD_ZLIB_LEVEL", "6"))
+
+# Admin listing page size (max 200)
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+
+# Cache the rendered blank enrollment form per language
+ENROLL_PAGE_CACHE = os.getenv("ENROLL_PAGE_CACHE", "true").lower() in ("1", "true", "yes")
+ENROLL_PAGE_MAX_AGE = int(os.getenv("ENROLL_PAGE_MAX_AGE", "300"))  # browser cache seconds; revalidated by ETag after
+
+# Confirmation-page data kept in memory after a submission (0 entries = off)
+SUCCESS_CACHE_SIZE = int(os.getenv("SUCCESS_CACHE_SIZE", "10000"))
+SUCCESS_CACHE_TTL = float(os.getenv("SUCCESS_CACHE_TTL", "3600"))  # seconds
+
+# Submission IDs reserved per counter round-trip (1 = strictly sequential IDs)
+SUBMISSION_ID_BLOCK = int(os.getenv("SUBMISSION_ID_BLOCK", "1"))
+
+# A new submission for the same student (school + name + dob) within this many days is stored
+# and flagged with the earlier submission ID in duplicate_of (0 = no identity check)
+DUPLICATE_WINDOW_DAYS = float(os.getenv("DUPLICATE_WINDOW_DAYS", "30"))
+
 # Demo settings
 INTERNAL_NOTIFY_EMAIL = os.getenv("INTERNAL_NOTIFY_EMAIL", "")  # Allen's district email for demo
 FROM_EMAIL = os.getenv("FROM_EMAIL", "enrollment-demo@msdaz.org")
@@ -17,14 +83,47 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Outbound email queue (outbox table drained in the background)
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "thread").lower()  # "thread" or "off" (run `flask drain-outbox` instead)
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", "30"))  # seconds, doubled per failed attempt
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "300"))  # a claimed message is retried if not settled by then
+
+# Reused SMTP sessions and internal-notification digests
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_MAX_MESSAGES = int(os.getenv("SMTP_MAX_MESSAGES", "100"))  # per session, then reconnect
+SMTP_NOOP_AFTER = float(os.getenv("SMTP_NOOP_AFTER", "30"))  # health-check sessions idle longer than this
+SMTP_MAX_IDLE = float(os.getenv("SMTP_MAX_IDLE", "240"))  # close sessions idle longer than this
+NOTIFY_DIGEST_INTERVAL = float(os.getenv("NOTIFY_DIGEST_INTERVAL", "0"))  # seconds; 0 = one internal email per submission
+NOTIFY_DIGEST_MAX = int(os.getenv("NOTIFY_DIGEST_MAX", "200"))  # submissions per digest email
 
 # Simple demo admin auth
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")  # set to enable /admin
 
+# JSON intake API for kiosks / batch data entry
+INTAKE_API_TOKEN = os.getenv("INTAKE_API_TOKEN", "")  # set to enable /api/submissions
+INTAKE_MAX_BATCH = int(os.getenv("INTAKE_MAX_BATCH", "500"))
+
+# Latency histograms served at /metrics (Prometheus text format); off = no timing at all
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_BUCKETS = tuple(
+    float(b) for b in os.getenv("METRICS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10").split(",")
+)
+# Shared directory where each worker writes its metrics so any worker can serve the
+# whole server's totals (gunicorn.conf.py sets one; empty = this process only)
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))  # max staleness of other workers' numbers
+
 SCHOOLS = [
     ("kuban", "Kuban Elementary School"),
     ("sullivan", "Sullivan Elementary School"),
 ]
+SCHOOL_NAMES = dict(SCHOOLS)
 
 # Transportation options
 TRANSPORT_OPTIONS_EN = [
@@ -126,7 +225,15 @@ LABELS = {
         "go_back": "Go Back",
         "continue": "Continue Without Email",
         "success_title": "Submission Received",
-        "next_steps": "Next steps: Please bring required documents to the school front office.",
+        "success_body": "Thank you. Your enrollment form was received. Please keep your submission ID.",
+        "submission_id": "Submission ID",
+        "received": "Received",
+        "next_steps": "Next steps",
+        "next_steps_body": "Please bring required documents to the school front office.",
+        "new_submission": "Start Another Enrollment",
+        "state": "State",
+        "err_required": "is required",
+        "err_invalid": "is not valid",
     },
     "es": {
         "title": "Inscripción Estudiantil",
@@ -208,7 +315,15 @@ LABELS = {
         "go_back": "Regresar",
         "continue": "Continuar sin correo",
         "success_title": "Solicitud recibida",
-        "next_steps": "Próximos pasos: Por favor traiga los documentos requeridos a la oficina de la escuela.",
+        "success_body": "Gracias. Recibimos su formulario de inscripción. Por favor guarde su número de solicitud.",
+        "submission_id": "Número de solicitud",
+        "received": "Recibido",
+        "next_steps": "Próximos pasos",
+        "next_steps_body": "Por favor traiga los documentos requeridos a la oficina de la escuela.",
+        "new_submission": "Iniciar otra inscripción",
+        "state": "Estado",
+        "err_required": "es obligatorio",
+        "err_invalid": "no es válido",
     },
 }
 
@@ -231,14 +346,800 @@ CUSTODY_OPTIONS_EN = ["Shared", "Mother", "Father", "DCS", "Other"]
 CUSTODY_OPTIONS_ES = ["Compartida", "Madre", "Padre", "DCS", "Otro"]
 
 
+class Field(NamedTuple):
+    """One form field in the declarative schema.
+
+    kind: text | date | choice | yesno | flag | multi | int | email | phone
+    when: predicate on the raw form; the field is only validated (and kept)
+          when it returns True. required applies only then.
+    column: submissions column this field is copied into, if any.
+    """
+
+    name: str
+    kind: str = "text"
+    required: bool = False
+    label: str = ""
+    pattern: Optional[str] = None
+    choices: tuple = ()
+    max_length: int = 200
+    when: Optional[Callable] = None
+    column: Optional[str] = None
+
+
+YES_NO = ("yes", "no")
+MAX_SIBLINGS = 20
+
+
+def _has_siblings(d) -> bool:
+    return d.get("has_murphy_siblings") == "yes"
+
+
+def _sibling_count(d) -> int:
+    try:
+        return int(d.get("sibling_count") or 0) if _has_siblings(d) else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _sibling_fields(i: int) -> list:
+    shown = lambda d: i <= _sibling_count(d)  # noqa: E731
+    return [
+        Field(f"sibling{i}_name", required=True, label="sibling_name", when=shown),
+        Field(f"sibling{i}_grade", label="sibling_grade", max_length=20, when=shown),
+        Field(f"sibling{i}_school", label="sibling_school", when=shown),
+        Field(f"sibling{i}_lives", "yesno", label="sibling_lives", when=shown),
+    ]
+
+
+FORM_SCHEMA = [
+    Field("school", "choice", True, choices=tuple(k for k, _ in SCHOOLS), column="school"),
+    Field("first_name", required=True, column="student_first"),
+    Field("middle_name"),
+    Field("last_name", required=True, column="student_last"),
+    Field("dob", "date", True, column="dob"),
+    Field("sex", "choice", True, choices=("male", "female")),
+    Field("grade", max_length=20),
+    Field("birth_state"),
+    Field("birth_country"),
+    Field("address1", required=True, label="address"),
+    Field("apt", max_length=20),
+    Field("city", required=True),
+    Field("state", required=True),
+    Field("zip", required=True, pattern=r"\d{5}"),
+    Field("az_school", "yesno"),
+    Field("az_school_details", when=lambda d: d.get("az_school") == "yes"),
+    Field("murphy_before", "yesno"),
+    Field("murphy_before_details", when=lambda d: d.get("murphy_before") == "yes"),
+    Field("preschool", "yesno"),
+    Field("preschool_details", when=lambda d: d.get("preschool") == "yes"),
+    Field("last_school"),
+    Field("last_school_city_state"),
+    Field("ethnicity", "yesno"),
+    Field("tribal_affiliation", "yesno", label="tribal"),
+    Field("race", "multi", choices=tuple(k for k, _ in RACE_OPTIONS_EN)),
+    Field("transport", "choice", choices=tuple(k for k, _ in TRANSPORT_OPTIONS_EN)),
+    Field("transport_other", required=True, label="transport", when=lambda d: d.get("transport") == "other"),
+    Field("has_murphy_siblings", "yesno", label="siblings_has_murphy"),
+    Field("sibling_count", "int", True, label="siblings_count", choices=(1, MAX_SIBLINGS), when=_has_siblings),
+    *[f for i in range(1, MAX_SIBLINGS + 1) for f in _sibling_fields(i)],
+    Field("custody_type", label="custody_type"),
+    Field("temp_address", "yesno"),
+    Field("entry_us", "date"),
+    Field("sped", "flag"),
+    Field("plan504", "flag"),
+    Field("gifted", "flag"),
+    Field("refugee", "flag"),
+    Field("migrant", "flag"),
+    Field("immigrant", "flag"),
+    Field("home_language"),
+    Field("expelled", "yesno"),
+    Field("suspended10", "yesno"),
+    Field("considered", "yesno"),
+    Field("parent_name", required=True, column="parent_name"),
+    Field("parent_cell", "phone", True, column="parent_phone"),
+    Field("parent_email", "email", column="parent_email"),
+    Field("typed_signature", required=True),
+    Field("agree", "flag", True, label="attestation"),
+]
+
+_KIND_PATTERNS = {
+    "email": r"[^@\s]+@[^@\s]+\.[^@\s]+",
+    "phone": r"\D*(?:\d\D*){10,15}",
+}
+
+
+class CompiledField(NamedTuple):
+    field: Field
+    regex: Optional[re.Pattern]
+    choices: frozenset
+
+
+def compile_schema(schema: list) -> list:
+    """Precompile regexes / choice sets once so validation is a single cheap pass."""
+    compiled = []
+    for f in schema:
+        pattern = f.pattern or _KIND_PATTERNS.get(f.kind)
+        compiled.append(CompiledField(f, re.compile(pattern) if pattern else None, frozenset(f.choices)))
+    return compiled
+
+
+COMPILED_SCHEMA = compile_schema(FORM_SCHEMA)
+FIELDS_BY_NAME = {f.name: f for f in FORM_SCHEMA}
+FIELD_COLUMNS = {f.column: f.name for f in FORM_SCHEMA if f.column}
+_COLUMN_FIELD_NAMES = frozenset(FIELD_COLUMNS.values())
+
+
+def _form_text(value, kind: str):
+    """A submitted value as stripped text, or None when it is not a scalar.
+
+    Forms only send strings; JSON clients may also send numbers and booleans
+    (``true`` sets a flag, ``false`` leaves it unset). Lists and objects are
+    never valid for a single field.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return ("1" if value else "") if kind == "flag" else str(value).lower()
+    if isinstance(value, (str, int, float)):
+        return str(value).strip()
+    return None
+
+
+def validate_form(raw) -> tuple:
+    """Validate a form (MultiDict or dict) against FORM_SCHEMA in one pass.
+
+    Returns ``(clean, errors)``: ``clean`` holds only schema fields (strings,
+    plus a list for multi-selects), ``errors`` maps field name to
+    ``"required"`` or ``"invalid"``.
+    """
+    getlist = raw.getlist if hasattr(raw, "getlist") else None
+    clean, errors = {}, {}
+    for f, regex, choices in COMPILED_SCHEMA:
+        if f.when is not None and not f.when(raw):
+            continue
+        if f.kind == "multi":
+            values = getlist(f.name) if getlist else raw.get(f.name) or []
+            values = values if isinstance(values, list) else [values]
+            texts = [_form_text(v, f.kind) for v in values]
+            clean[f.name] = [v for v in texts if v is not None]
+            if any(v is None or v not in choices for v in texts):
+                errors[f.name] = "invalid"
+            elif f.required and not values:
+                errors[f.name] = "required"
+            continue
+        value = _form_text(raw.get(f.name), f.kind)
+        if value is None:
+            clean[f.name] = ""
+            errors[f.name] = "invalid"
+            continue
+        clean[f.name] = value
+        if not value:
+            if f.required:
+                errors[f.name] = "required"
+            continue
+        ok = len(value) <= f.max_length
+        if ok and regex is not None:
+            ok = regex.fullmatch(value) is not None
+        if ok and f.kind == "choice":
+            ok = value in choices
+        elif ok and f.kind == "yesno":
+            ok = value in YES_NO
+        elif ok and f.kind == "flag":
+            ok = value in ("1", "on", "true")
+        elif ok and f.kind == "date":
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                ok = False
+        elif ok and f.kind == "int":
+            ok = value.isdigit() and (not f.choices or f.choices[0] <= int(value) <= f.choices[1])
+        if not ok:
+            errors[f.name] = "invalid"
+    return clean, errors
+
+
+def error_messages(errors: dict, lang: str) -> list:
+    labels = LABELS[lang]
+    messages = []
+    for name, code in errors.items():
+        f = FIELDS_BY_NAME[name]
+        label = labels.get(f.label or name, name)
+        sibling = re.match(r"sibling(\d+)_", name)
+        if sibling:
+            label = f"{labels['siblings']} {sibling.group(1)}: {label}"
+        messages.append(f"{label} {labels['err_' + code]}")
+    return messages
+
+
+def error_details(errors: dict, lang: str) -> dict:
+    """JSON shape of validation errors: field -> {code, message}."""
+    return {k: {"code": v, "message": msg} for (k, v), msg in zip(errors.items(), error_messages(errors, lang))}
+
+
+# validate_form output is only str / list-of-str in schema order, so it can be
+# encoded in one pass with no per-key probing or circular-reference checks.
+PAYLOAD_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+
+def prune_payload(payload: dict) -> dict:
+    """Drop unanswered fields and the ones already stored in submissions columns."""
+    return {k: v for k, v in payload.items() if v not in ("", None, []) and k not in _COLUMN_FIELD_NAMES}
+
+
+class PayloadDictionaries:
+    """Shared zlib dictionaries from the payload_dicts table, cached per process.
+
+    Dictionaries are never modified once written, so any process can decode
+    any row; new rows are encoded with the newest one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dicts = {0: b""}  # id 0 = plain deflate, no dictionary
+        self._active = None
+
+    def get(self, conn: sqlite3.Connection, dict_id: int) -> bytes:
+        with self._lock:
+            zdict = self._dicts.get(dict_id)
+        if zdict is None:
+            row = conn.execute("SELECT zdict FROM payload_dicts WHERE id=?", (dict_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"unknown payload dictionary {dict_id}")
+            zdict = bytes(row[0])
+            with self._lock:
+                self._dicts[dict_id] = zdict
+        return zdict
+
+    def active(self, conn: sqlite3.Connection) -> tuple:
+        if self._active is None:
+            row = conn.execute("SELECT MAX(id) FROM payload_dicts").fetchone()
+            dict_id = row[0] or 0
+            self._active = (dict_id, self.get(conn, dict_id))
+        return self._active
+
+    def reset(self) -> None:
+        self._active = None
+
+    def snapshot(self, conn: sqlite3.Connection) -> dict:
+        """Every dictionary by id, for processes that decode without a database connection."""
+        return {0: b"", **{r[0]: bytes(r[1]) for r in conn.execute("SELECT id, zdict FROM payload_dicts")}}
+
+    def preload(self, dicts: dict) -> None:
+        with self._lock:
+            self._dicts.update(dicts)
+
+
+PAYLOAD_DICTS = PayloadDictionaries()
+
+
+def encode_payload(clean: dict, conn: Optional[sqlite3.Connection] = None, mode: str = ""):
+    """Serialize a validated payload for payload_json according to PAYLOAD_STORAGE.
+
+    Returns text for "json"/"compact" and a BLOB for "zlib":
+    b"Z" + 2-byte dictionary id + raw deflate stream.
+    """
+    mode = mode or PAYLOAD_STORAGE
+    if mode not in ("compact", "zlib"):
+        return PAYLOAD_ENCODER.encode(clean)
+    text = PAYLOAD_ENCODER.encode(prune_payload(clean))
+    if mode == "compact":
+        return text
+    return compress_payload(text, conn)
+
+
+def compress_payload(text: str, conn: sqlite3.Connection) -> bytes:
+    """zlib storage form of already-compacted payload JSON, using the active dictionary."""
+    dict_id, zdict = PAYLOAD_DICTS.active(conn)
+    co = zlib.compressobj(PAYLOAD_ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=zdict) if zdict else zlib.compressobj(PAYLOAD_ZLIB_LEVEL, zlib.DEFLATED, -15)
+    return b"Z" + dict_id.to_bytes(2, "big") + co.compress(text.encode("utf-8")) + co.flush()
+
+
+def decode_payload(value, row=None, conn: Optional[sqlite3.Connection] = None) -> dict:
+    """Inverse of encode_payload for any storage mode.
+
+    With ``row`` (a submissions row), fields pruned because they live in
+    columns are put back under their form names.
+    """
+    if not value:
+        payload = {}
+    elif isinstance(value, (bytes, memoryview)):
+        value = bytes(value)
+        if value[:1] != b"Z":
+            raise ValueError("unknown payload encoding")
+        zdict = PAYLOAD_DICTS.get(conn, int.from_bytes(value[1:3], "big"))
+        do = zlib.decompressobj(-15, zdict=zdict) if zdict else zlib.decompressobj(-15)
+        payload = json.loads(do.decompress(value[3:]) + do.flush())
+    else:
+        payload = json.loads(value)
+    if row is not None:
+        keys = row.keys()
+        for col, name in FIELD_COLUMNS.items():
+            if col in keys and row[col] and not payload.get(name) and not payload.get(col):
+                payload[name] = row[col]
+    return payload
+
+
+def payload_text(row, conn: sqlite3.Connection) -> str:
+    """payload_json of a row as JSON text (for exports), whatever its storage mode."""
+    value = row["payload_json"]
+    if isinstance(value, str) and PAYLOAD_STORAGE == "json":
+        return value
+    return PAYLOAD_ENCODER.encode(decode_payload(value, row, conn))
+
+
+def _dictionary_tokens(payloads) -> Counter:
+    counts = Counter()
+    for payload in payloads:
+        for key, value in payload.items():
+            counts[f'"{key}":'] += 1
+            if isinstance(value, str) and len(value) <= 40:
+                counts[f'"{key}":{PAYLOAD_ENCODER.encode(value)},'] += 1
+    return counts
+
+
+def train_payload_dict(conn: sqlite3.Connection, sample: int = 5000, size: int = 32768) -> int:
+    """Build a zlib dictionary from the most common key/value fragments of stored payloads.
+
+    Falls back to the schema field names on an empty table. Stores the
+    dictionary in payload_dicts and returns its id; caller commits.
+    """
+    rows = conn.execute(
+        f"SELECT {', '.join(FIELD_COLUMNS)}, payload_json FROM submissions ORDER BY random() LIMIT ?", (sample,)
+    ).fetchall()
+    counts = _dictionary_tokens(prune_payload(decode_payload(r["payload_json"], r, conn)) for r in rows)
+    if not counts:
+        counts = Counter({f'"{f.name}":': 1 for f in FORM_SCHEMA if f.name not in _COLUMN_FIELD_NAMES})
+    chosen, total = [], 0
+    for token, n in sorted(counts.items(), key=lambda kv: kv[1] * len(kv[0]), reverse=True):
+        if n < 2 and len(counts) > 1 and rows:
+            continue
+        if total + len(token.encode("utf-8")) > size:
+            break
+        chosen.append((n, token))
+        total += len(token.encode("utf-8"))
+    # zlib favours dictionary bytes near the end, so the most frequent fragments go last.
+    zdict = "".join(token for _, token in sorted(chosen)).encode("utf-8")
+    cur = conn.execute(
+        "INSERT INTO payload_dicts(created_at, zdict) VALUES(?, ?)", (datetime.now().isoformat(timespec="seconds"), zdict)
+    )
+    PAYLOAD_DICTS.reset()
+    return cur.lastrowid
+
+
+def db_size(conn: sqlite3.Connection) -> int:
+    """Bytes used by the main database file (page_count * page_size)."""
+    return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def recode_payloads(conn: sqlite3.Connection, mode: str, batch: int = 1000) -> int:
+    """Re-encode every stored payload with ``mode``, one transaction per batch."""
+    count, last_id = 0, 0
+    cols = ", ".join(FIELD_COLUMNS)
+    while True:
+        rows = conn.execute(
+            f"SELECT id, {cols}, payload_json FROM submissions WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch)
+        ).fetchall()
+        if not rows:
+            return count
+
+        def rewrite(c):
+            c.executemany(
+                "UPDATE submissions SET payload_json=? WHERE id=?",
+                [(encode_payload(decode_payload(r["payload_json"], r, c), c, mode), r["id"]) for r in rows],
+            )
+
+        run_write(conn, rewrite)
+        count += len(rows)
+        last_id = rows[-1]["id"]
+
+
+def submission_columns(data: dict) -> dict:
+    """submissions column values for a payload (older payloads used the column names as keys)."""
+    return {col: data.get(name) or data.get(col) for col, name in FIELD_COLUMNS.items()}
+
+
+def stored_value(row, payload: dict, column: str):
+    """A column-backed field of a stored submission: the column first, then the payload (see submission_columns)."""
+    return row[column] or payload.get(FIELD_COLUMNS[column]) or payload.get(column)
+
+
+_SUBMIT_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+def submit_token(value) -> Optional[str]:
+    """The per-form token the page generates (hidden ``submission_token`` field), or None if absent/malformed."""
+    value = value.strip() if isinstance(value, str) else ""
+    return value if _SUBMIT_TOKEN_RE.fullmatch(value) else None
+
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def fold_name(value: str) -> str:
+    """Lowercase, strip accents and collapse punctuation/whitespace: 'Núñez-López ' -> 'nunez lopez'."""
+    text = unicodedata.normalize("NFKD", value or "")
+    if not text.isascii():
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD_RE.sub(" ", text.casefold()).split())
+
+
+def identity_key(school, student_last, student_first, dob) -> Optional[str]:
+    """Normalized student identity used to recognise resubmissions; None without a full name and dob."""
+    last, first = fold_name(student_last), fold_name(student_first)
+    if not (last and first and dob):
+        return None
+    return f"{school or ''}|{last}|{first}|{dob}"
+
+
+def find_replay(conn: sqlite3.Connection, token: Optional[str]) -> Optional[str]:
+    """submission_id of the submission already stored under this form's submission token."""
+    if not token:
+        return None
+    row = conn.execute("SELECT submission_id FROM submissions WHERE submit_token = ?", (token,)).fetchone()
+    return row[0] if row else None
+
+
+def find_same_student(conn: sqlite3.Connection, now: datetime, key: Optional[str]) -> Optional[str]:
+    """submission_id of the latest submission with this identity_key within DUPLICATE_WINDOW_DAYS."""
+    if not key or DUPLICATE_WINDOW_DAYS <= 0:
+        return None
+    since = (now - timedelta(days=DUPLICATE_WINDOW_DAYS)).isoformat(timespec="seconds")
+    row = conn.execute(
+        "SELECT submission_id FROM submissions WHERE identity_key = ? AND created_at >= ?"
+        " ORDER BY created_at DESC LIMIT 1",
+        (key, since),
+    ).fetchone()
+    return row[0] if row else None
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name: str, labels: tuple):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe_labels(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+
+_NO_TIMER = nullcontext()
+
+
+class Metrics:
+    """Latency histograms in the Prometheus text format; ``timer()`` is a no-op when disabled.
+
+    With ``directory`` each process flushes a snapshot there and ``render`` merges them (see the README).
+    """
+
+    def __init__(self, enabled: bool, buckets: tuple, directory: str = "", flush_seconds: float = 1.0):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.process_stats = dict  # () -> {name: (type, value)} for this process; set once the app is defined
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._series = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._local = threading.local()
+        self._path = None
+        self._started = 0
+        self._flusher = False
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if self.enabled:
+            self.observe_labels(name, tuple(sorted(labels.items())), seconds)
+
+    def _after_fork(self) -> None:
+        # Locks may have been held by a parent thread at fork time; the series are the parent's.
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._series = {}
+        self._path = None
+        self._flusher = False
+
+    def observe_labels(self, name: str, labels: tuple, seconds: float) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get((name, labels))
+            if series is None:
+                series = self._series[(name, labels)] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+        if self.directory and not self._flusher:
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        with self._flush_lock:
+            if self._flusher:
+                return
+            self._flusher = True
+        threading.Thread(target=self._flush_forever, name="metrics-flush", daemon=True).start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            series = [[name, labels, list(values)] for (name, labels), values in self._series.items()]
+        return {"pid": os.getpid(), "series": series, "stats": self.process_stats()}
+
+    def flush(self) -> None:
+        """Write this process's snapshot to ``directory``."""
+        with self._flush_lock:
+            snapshot = self._snapshot()
+            if self._path is None:
+                # Start time in the name: a reused pid never overwrites a dead worker's totals.
+                self._started = time.time_ns()
+                self._path = os.path.join(self.directory, f"{os.getpid()}-{self._started}.json")
+            snapshot["started"] = self._started
+            tmp = f"{self._path}.tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(snapshot, f, separators=(",", ":"))
+                os.replace(tmp, self._path)
+            except OSError:
+                app.logger.exception("metrics flush failed")
+
+    def _snapshots(self) -> list:
+        if not self.directory:
+            snapshot = self._snapshot()
+            snapshot["pid"] = None
+            return [snapshot]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # removed or replaced while listing
+        return snapshots
+
+    # Template timing hooks (connected to Flask's render signals when enabled).
+    def template_started(self, sender, template, context, **extra) -> None:
+        self._local.__dict__.setdefault("templates", []).append(time.perf_counter())
+
+    def template_finished(self, sender, template, context, **extra) -> None:
+        starts = getattr(self._local, "templates", None)
+        if starts:
+            self.observe("enroll_template_render_seconds", time.perf_counter() - starts.pop(), template=template.name)
+
+    def render(self, gauges: dict) -> str:
+        """All processes' histograms and stats, plus shared ``gauges`` ({name: (type, value)}), as exposition text."""
+        merged, counters, process_gauges, newest = {}, {}, {}, {}
+        for snapshot in sorted(self._snapshots(), key=lambda s: s.get("started", 0)):
+            for name, labels, values in snapshot["series"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                total = merged.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+            pid = snapshot["pid"]
+            if pid is not None and not _process_alive(pid):
+                pid = False
+            newest[pid] = snapshot  # sorted by start, so the current process holding a reused pid wins
+            for name, (kind, value) in snapshot["stats"].items():
+                if kind == "counter":
+                    counters[name] = counters.get(name, 0) + value
+        for pid, snapshot in newest.items():
+            if pid is False:
+                continue
+            for name, (kind, value) in snapshot["stats"].items():
+                if kind != "counter":
+                    process_gauges.setdefault(name, []).append((pid, value))
+
+        lines, typed = [], set()
+        for (name, labels), series in sorted(merged.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            base = ",".join(f'{k}="{_prom_escape(str(v))}"' for k, v in labels)
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            plain = f"{{{base}}}" if base else ""
+            lines.append(f"{name}_sum{plain} {series[-1]:.6f}")
+            lines.append(f"{name}_count{plain} {cumulative}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, values in sorted(process_gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            for pid, value in sorted(values, key=lambda v: v[0] or 0):
+                lines.append(f'{name}{{pid="{pid}"}} {value}' if pid else f"{name} {value}")
+        for name, (kind, value) in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        return False  # no signal-0 probe; multi-process metrics are a gunicorn (POSIX) setup
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _prom_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics(METRICS_ENABLED, METRICS_BUCKETS, METRICS_DIR, METRICS_FLUSH_SECONDS)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived SQLite connections shared by every request.
+
+    Connections are opened lazily (up to ``size``), tuned once with WAL and the
+    DB_* pragmas, and handed back to the pool instead of being closed. A forked
+    worker starts with an empty pool; connections inherited from the parent
+    are left untouched, as SQLite requires.
+    """
+
+    def __init__(self, path: str, size: int, timeout: float):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._pid = os.getpid()
+        self._inherited = []
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        synchronous = DB_SYNCHRONOUS if DB_SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA") else "NORMAL"
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.execute(f"PRAGMA cache_size={DB_CACHE_SIZE:d}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE:d}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _after_fork(self) -> None:
+        # Keep the parent's connections referenced so they are never closed
+        # (closing would drop the parent's POSIX locks on the database file).
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            while True:
+                try:
+                    self._inherited.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            self._created = 0
+            self._pid = os.getpid()
+
+    def acquire(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._after_fork()
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+            kind = "hits"
+        except queue.Empty:
+            with self._lock:
+                can_open = self._created < self.size
+                if can_open:
+                    self._created += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                kind = "misses"
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"no SQLite connection free after {self.timeout}s")
+                kind = "waits"
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+            self.checkouts += 1
+            self.checkout_seconds += elapsed
+            self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if self._pid != os.getpid():
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it and let the next checkout open a fresh one.
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "checkouts": self.checkouts,
+                "avg_checkout_ms": round(1000 * self.checkout_seconds / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_checkout_ms": round(1000 * self.max_checkout_seconds, 3),
+            }
+
+
+POOL = ConnectionPool(DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+
+
 def db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Pooled connection bound to the current app context (returned on teardown)."""
+    if "db_conn" not in g:
+        try:
+            g.db_conn = POOL.acquire()
+        except PoolTimeout:
+            abort(503)
+    return g.db_conn
 
 
 def init_db() -> None:
-    conn = db()
+    with POOL.connection() as conn:
+        _create_schema(conn)
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
     cur = conn.cursor()
     cur.execute(
         """
@@ -266,176 +1167,855 @@ def init_db() -> None:
         );
         """
     )
-    conn.commit()
-    conn.close()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payload_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT,
+            zdict BLOB NOT NULL
+        );
+        """
+    )
+    if PAYLOAD_STORAGE == "zlib" and not cur.execute("SELECT 1 FROM payload_dicts LIMIT 1").fetchone():
+        train_payload_dict(conn)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT,
+            submission_id TEXT,
+            to_addr TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'single',
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            sent_at TEXT
+        );
+        """
+    )
+    _add_column(conn, "outbox", "kind", "TEXT NOT NULL DEFAULT 'single'")
+    # Admin listing filters (the name search indexes are on the folded names, below). id is the
+    # rowid, which SQLite appends to every index, so equal keys already come back in id order.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_school ON submissions(school)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_lang ON submissions(lang)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_created ON submissions(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_dob ON submissions(dob)")
+    # Full-text index over the searchable payload fields; rowid = submissions.id
+    fts_exists = cur.execute("SELECT 1 FROM sqlite_master WHERE name='submissions_fts'").fetchone()
+    cur.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS submissions_fts USING fts5(
+            {', '.join(SEARCH_FIELDS)},
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        """
+    )
+    if not fts_exists:
+        rebuild_search_index(conn)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
 
+    # Typed copies of payload fields: flag/attribute columns plus sibling and race tables
+    added = [_add_column(conn, "submissions", col, decl) for col, decl in TYPED_COLUMNS]
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS submission_siblings (
+            submission_row INTEGER NOT NULL REFERENCES submissions(id),
+            position INTEGER NOT NULL,
+            name TEXT,
+            grade TEXT,
+            school TEXT,
+            lives_with INTEGER,
+            PRIMARY KEY (submission_row, position)
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS submission_races (
+            submission_row INTEGER NOT NULL REFERENCES submissions(id),
+            race TEXT NOT NULL,
+            PRIMARY KEY (submission_row, race)
+        );
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_siblings_name ON submission_siblings(name COLLATE NOCASE)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_races_race ON submission_races(race)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_grade ON submissions(grade)")
+    if any(added):
+        backfill_normalized(conn)
 
-def next_submission_id(year: int) -> str:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT seq FROM counters WHERE year=?", (year,))
-    row = cur.fetchone()
-    if row is None:
-        seq = 1
-        cur.execute("INSERT INTO counters(year, seq) VALUES(?, ?)", (year, seq))
-    else:
-        seq = int(row[0]) + 1
-        cur.execute("UPDATE counters SET seq=? WHERE year=?", (seq, year))
+    # Idempotency: per-form token (unique; a replay returns the original). The normalized student
+    # identity only flags a new submission as a possible duplicate (duplicate_of, below).
+    # The folded names serve the admin name search (BINARY, so GLOB 'abc*' can use the indexes;
+    # (last_folded, first_folded) lets "Last, First" narrow both names in one index range).
+    _add_column(conn, "submissions", "submit_token", "TEXT")
+    if any([_add_column(conn, "submissions", col, "TEXT") for col in ("identity_key", "last_folded", "first_folded")]):
+        backfill_identity_keys(conn)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_folded_name ON submissions(last_folded, first_folded)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_first_folded ON submissions(first_folded)")
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_submissions_token ON submissions(submit_token)"
+        " WHERE submit_token IS NOT NULL"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submissions_identity ON submissions(identity_key, created_at)")
+    _add_column(conn, "submissions", "duplicate_of", "TEXT")  # earlier submission_id for the same student
+
+    # Family links: family id per submission, plus each family's blocking keys (see link_family)
+    families_exist = cur.execute("SELECT 1 FROM sqlite_master WHERE name='submission_families'").fetchone()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS submission_families (
+            submission_row INTEGER PRIMARY KEY REFERENCES submissions(id),
+            family_id INTEGER NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS family_keys (
+            key TEXT NOT NULL,
+            family_id INTEGER NOT NULL,
+            PRIMARY KEY (key, family_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_submission_families_family ON submission_families(family_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_family_keys_family ON family_keys(family_id)")
+    if not families_exist:
+        rebuild_family_links(conn)
+
+    # Dashboard counters, maintained by count_submission on every insert
+    counts_exist = cur.execute("SELECT 1 FROM sqlite_master WHERE name='enrollment_counts'").fetchone()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS enrollment_counts (
+            school TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value, school)
+        ) WITHOUT ROWID;
+        """
+    )
+    if not counts_exist:
+        rebuild_enrollment_counts(conn)
     conn.commit()
-    conn.close()
-    return f"MUR-{year}-{seq:05d}"
 
 
-def send_email(to_addr: str, subject: str, body: str) -> None:
-    if not SMTP_HOST or not to_addr:
-        return
+def backfill_identity_keys(conn: sqlite3.Connection) -> int:
+    """Recompute identity_key and the folded names for every submission from its name/dob/school columns."""
+    rows = conn.execute("SELECT id, school, student_last, student_first, dob FROM submissions").fetchall()
+    conn.executemany(
+        "UPDATE submissions SET identity_key = ?, last_folded = ?, first_folded = ? WHERE id = ?",
+        [
+            (identity_key(r["school"], r["student_last"], r["student_first"], r["dob"]),
+             fold_name(r["student_last"]), fold_name(r["student_first"]), r["id"])
+            for r in rows
+        ],
+    )
+    return len(rows)
 
-    msg = EmailMessage()
-    msg["From"] = FROM_EMAIL
-    msg["To"] = to_addr
-    msg["Subject"] = subject
-    msg.set_content(body)
 
-    if SMTP_USE_TLS:
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-    else:
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> bool:
+    """ALTER TABLE ... ADD COLUMN for databases created before the column existed.
 
-    if SMTP_USERNAME:
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
+    Returns True when the column was added.
+    """
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if column in cols:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
 
-    server.send_message(msg)
-    server.quit()
 
+class SubmissionIdAllocator:
+    """Hands out per-year submission sequence numbers from the counters table.
 
-def require_admin():
-    if not ADMIN_PASSWORD:
-        abort(404)
-    pw = request.args.get("pw") or request.headers.get("X-Admin-PW")
-    if pw != ADMIN_PASSWORD:
-        abort(401)
+    Every reservation is one atomic ``INSERT ... ON CONFLICT DO UPDATE ...
+    RETURNING``, so two workers can never read the same seq. With
+    ``block_size > 1`` each process reserves a range at once and serves IDs
+    from memory until it is used up: IDs stay unique across workers but are no
+    longer strictly in submission order, and a restart leaves a gap. A block
+    reserved inside a transaction is private to that connection until
+    :meth:`commit`; :meth:`rollback` forgets it.
+    """
 
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._blocks = {}  # year -> [next_seq, last_seq], committed
+        self._pending = {}  # connection -> {year: [next_seq, last_seq]} reserved in its open transaction
+        self._pid = os.getpid()
 
-app = Flask(__name__)
-app.secret_key = APP_SECRET
+    @staticmethod
+    def reserve(conn: sqlite3.Connection, year: int, count: int) -> int:
+        """Bump the year's counter by ``count`` and return the new (last reserved) seq."""
+        row = conn.execute(
+            """
+            INSERT INTO counters(year, seq) VALUES(?, ?)
+            ON CONFLICT(year) DO UPDATE SET seq = seq + excluded.seq
+            RETURNING seq
+            """,
+            (year, count),
+        ).fetchone()
+        return int(row[0])
 
+    def allocate(self, conn: sqlite3.Connection, year: int) -> int:
+        """Return the next seq for ``year``.
 
-@app.route("/")
-def home():
-    return redirect(url_for("enroll", lang=request.args.get("lang", "en")))
+        Runs inside the caller's transaction when there is one; the caller is
+        responsible for committing it and then calling :meth:`commit` (or
+        :meth:`rollback`), as run_write does.
+        """
+        if self.block_size == 1:
+            return self.reserve(conn, year, 1)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: never reuse a block inherited from the parent.
+                self._blocks.clear()
+                self._pending.clear()
+                self._pid = os.getpid()
+            block = self._pending.get(conn, {}).get(year)
+            if block is None or block[0] > block[1]:
+                block = self._blocks.get(year)
+            if block is None or block[0] > block[1]:
+                in_txn = conn.in_transaction
+                last = self.reserve(conn, year, self.block_size)
+                block = [last - self.block_size + 1, last]
+                if in_txn:
+                    self._pending.setdefault(conn, {})[year] = block
+                else:
+                    conn.commit()
+                    self._blocks[year] = block
+            seq = block[0]
+            block[0] += 1
+        return seq
 
+    def commit(self, conn: sqlite3.Connection) -> None:
+        """Share the blocks ``conn`` reserved now that its transaction has committed."""
+        with self._lock:
+            self._blocks.update(self._pending.pop(conn, {}))
 
-@app.route("/enroll", methods=["GET", "POST"])
-def enroll():
-    lang = request.args.get("lang", "en")
-    if lang not in ("en", "es"):
-        lang = "en"
+    def rollback(self, conn: sqlite3.Connection) -> None:
+        """Forget the blocks ``conn`` reserved in a transaction that rolled back."""
+        with self._lock:
+            self._pending.pop(conn, None)
 
-    labels = LABELS[lang]
-    race_options = RACE_OPTIONS_EN if lang == "en" else RACE_OPTIONS_ES
-    custody_options = CUSTODY_OPTIONS_EN if lang == "en" else CUSTODY_OPTIONS_ES
-    transport_options = TRANSPORT_OPTIONS_EN if lang == "en" else TRANSPORT_OPTIONS_ES
 
-    if request.method == "GET":
-        return render_template(
-            "enroll.html",
-            lang=lang,
-            labels=labels,
-            schools=SCHOOLS,
-            race_options=race_options,
-            custody_options=custody_options,
-            transport_options=transport_options,
-            values={},
-            email_warning=False,
-        )
+ID_ALLOCATOR = SubmissionIdAllocator(SUBMISSION_ID_BLOCK)
 
-    data = request.form.to_dict(flat=True)
 
-    # Collect multi-select race
-    data["race"] = request.form.getlist("race")
+def format_submission_id(year: int, seq: int) -> str:
+    return f"MUR-{year}-{seq:05d}"
 
-    # Basic required fields
-    required = ["school", "student_first", "student_last", "dob", "parent_name", "parent_phone", "typed_signature", "attest_check"]
-    missing = [k for k in required if not data.get(k)]
 
-    # Email warning flow
-    parent_email = (data.get("parent_email") or "").strip()
-    email_skip_confirmed = data.get("email_skip_confirmed") == "1"
-    if not parent_email and not email_skip_confirmed:
-        # Render same page with warning modal
-        return render_template(
-            "enroll.html",
-            lang=lang,
-            labels=labels,
-            schools=SCHOOLS,
-            race_options=race_options,
-            custody_options=custody_options,
-            transport_options=transport_options,
-            values=data,
-            missing=missing,
-            email_warning=True,
-        )
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
 
-    if missing:
-        return render_template(
-            "enroll.html",
-            lang=lang,
-            labels=labels,
-            schools=SCHOOLS,
-            race_options=race_options,
-            custody_options=custody_options,
-            transport_options=transport_options,
-            values=data,
-            missing=missing,
-            email_warning=False,
-        ), 400
 
-    # Create submission
-    now = datetime.now()
-    year = now.year
-    submission_id = next_submission_id(year)
-
-    payload = data.copy()
-    payload["race"] = data.get("race", [])
-    
-    # Filter out any non-serializable values from payload
-    for key in list(payload.keys()):
+def run_write(conn: sqlite3.Connection, fn, *args):
+    """Run ``fn(conn, *args)`` in one ``BEGIN IMMEDIATE`` transaction and commit once.
+
+    SQLITE_BUSY ("database is locked") rolls back and retries with jittered
+    exponential backoff up to DB_WRITE_RETRIES times; any other error rolls
+    back and propagates. ID blocks reserved by ``fn`` are shared with other
+    threads only after the commit succeeds.
+    """
+    delay = DB_RETRY_BACKOFF
+    for attempt in range(DB_WRITE_RETRIES + 1):
         try:
-            json.dumps(payload[key])
-        except (TypeError, ValueError):
-            # Remove non-serializable values
-            del payload[key]
+            with METRICS.timer("enroll_db_write_seconds", op=fn.__name__):
+                conn.execute("BEGIN IMMEDIATE")
+                result = fn(conn, *args)
+                conn.commit()
+            ID_ALLOCATOR.commit(conn)
+            return result
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.rollback()
+            ID_ALLOCATOR.rollback(conn)
+            retryable = isinstance(exc, sqlite3.OperationalError) and _is_busy(exc)
+            if not retryable or attempt == DB_WRITE_RETRIES:
+                raise
+        time.sleep(delay * (1 + random.random()))
+        delay *= 2
 
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
+
+def insert_submission(conn: sqlite3.Connection, now: datetime, lang: str, data: dict, token: Optional[str] = None) -> str:
+    """Allocate a submission ID and insert the row; meant to run inside run_write."""
+    with METRICS.timer("enroll_db_seconds", op="allocate_id"):
+        submission_id = format_submission_id(now.year, ID_ALLOCATOR.allocate(conn, now.year))
+    cols = submission_columns(data)
+    key = identity_key(cols["school"], cols["student_last"], cols["student_first"], cols["dob"])
+    with METRICS.timer("enroll_db_seconds", op="find_same_student"):
+        duplicate_of = find_same_student(conn, now, key)
+    with METRICS.timer("enroll_db_seconds", op="insert_submission"):
+        cur = conn.execute(
+            """
+            INSERT INTO submissions(
+                submission_id, created_at, lang, school,
+                student_first, student_last, dob,
+                parent_name, parent_email, parent_phone,
+                payload_json, submit_token, identity_key, last_folded, first_folded, duplicate_of
+            ) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            """,
+            (
+                submission_id,
+                now.isoformat(timespec="seconds"),
+                lang,
+                cols["school"],
+                cols["student_first"],
+                cols["student_last"],
+                cols["dob"],
+                cols["parent_name"],
+                (cols["parent_email"] or "").strip(),
+                cols["parent_phone"],
+                encode_payload(data, conn),
+                token,
+                key,
+                fold_name(cols["student_last"]),
+                fold_name(cols["student_first"]),
+                duplicate_of,
+            ),
+        )
+    with METRICS.timer("enroll_db_seconds", op="derived_tables"):
+        store_normalized(conn, cur.lastrowid, data)
+        index_submission(conn, cur.lastrowid, {**data, "submission_id": submission_id})
+        count_submission(conn, lang, data)
+    with METRICS.timer("enroll_db_seconds", op="link_family"):
+        link_family(conn, cur.lastrowid, data)
+    with METRICS.timer("enroll_db_seconds", op="enqueue_email"):
+        for to_addr, subject, body, kind in notification_emails(submission_id, lang, data):
+            enqueue_email(conn, submission_id, to_addr, subject, body, kind)
+    return submission_id
+
+
+def submit_enrollment(conn: sqlite3.Connection, now: datetime, lang: str, data: dict, token: Optional[str] = None) -> tuple:
+    """Insert a submission unless its token replays an earlier one; returns ``(submission_id, created)``.
+
+    The replay lookup runs in the caller's write transaction, so two
+    concurrent replays cannot both insert, and a replay allocates no ID.
+    A different form for the same student is inserted and only flagged
+    (``duplicate_of``) for staff to review.
+    """
+    with METRICS.timer("enroll_db_seconds", op="find_replay"):
+        existing = find_replay(conn, token)
+    if existing:
+        return existing, False
+    return insert_submission(conn, now, lang, data, token), True
+
+
+SERVICE_FLAGS = ("sped", "plan504", "gifted", "refugee", "migrant", "immigrant")
+TYPED_COLUMNS = [(flag, "INTEGER NOT NULL DEFAULT 0") for flag in SERVICE_FLAGS] + [
+    ("grade", "TEXT"),
+    ("sex", "TEXT"),
+    ("transport", "TEXT"),
+    ("home_language", "TEXT"),
+]
+RACE_KEYS = {key for key, _ in RACE_OPTIONS_EN}
+
+
+def _yes_no(value):
+    return {"yes": 1, "no": 0}.get((value or "").strip().lower())
+
+
+def normalize_payload(payload: dict) -> tuple:
+    """Split a form payload into (typed column values, sibling rows, race keys)."""
+    columns = {flag: 1 if payload.get(flag) else 0 for flag in SERVICE_FLAGS}
+    for col, _ in TYPED_COLUMNS[len(SERVICE_FLAGS):]:
+        columns[col] = (payload.get(col) or "").strip() or None
+    siblings = []
+    for i in range(1, MAX_SIBLINGS + 1):
+        sib = [(payload.get(f"sibling{i}_{k}") or "").strip() for k in ("name", "grade", "school", "lives")]
+        if any(sib):
+            siblings.append((i, sib[0] or None, sib[1] or None, sib[2] or None, _yes_no(sib[3])))
+    race = payload.get("race") or []
+    if isinstance(race, str):
+        race = [race]
+    races = sorted({r for r in race if r in RACE_KEYS})
+    return columns, siblings, races
+
+
+def store_normalized(conn: sqlite3.Connection, rowid: int, payload: dict) -> None:
+    """Write the typed columns and sibling/race rows for one submission."""
+    columns, siblings, races = normalize_payload(payload)
+    conn.execute(
+        f"UPDATE submissions SET {', '.join(f'{c}=?' for c in columns)} WHERE id=?",
+        list(columns.values()) + [rowid],
+    )
+    conn.executemany(
+        "INSERT INTO submission_siblings(submission_row, position, name, grade, school, lives_with) VALUES(?,?,?,?,?,?)",
+        [(rowid,) + sib for sib in siblings],
+    )
+    conn.executemany("INSERT INTO submission_races(submission_row, race) VALUES(?,?)", [(rowid, r) for r in races])
+
+
+def backfill_normalized(conn: sqlite3.Connection) -> int:
+    """Re-derive typed columns and sibling/race rows from every stored payload; caller commits."""
+    conn.execute("DELETE FROM submission_siblings")
+    conn.execute("DELETE FROM submission_races")
+    cur = conn.execute(f"SELECT id, {', '.join(FIELD_COLUMNS)}, payload_json FROM submissions")
+    count = 0
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return count
+        for r in rows:
+            store_normalized(conn, r["id"], decode_payload(r["payload_json"], r, conn))
+        count += len(rows)
+
+
+# Dashboard rollups: enrollment_counts holds one counter per (school, dimension, value)
+DASHBOARD_DIMENSIONS = ("total", "lang", "grade", "sex", "transport", "service", "race")
+
+
+def _count_keys(school, lang, columns, races) -> list:
+    """(school, dimension, value) counters one submission adds to; ``columns`` as from normalize_payload."""
+    school = school or ""
+    keys = [(school, "total", ""), (school, "lang", lang or "")]
+    keys += [(school, dim, columns[dim] or "") for dim in ("grade", "sex", "transport")]
+    keys += [(school, "service", flag) for flag in SERVICE_FLAGS if columns[flag]]
+    keys += [(school, "race", race) for race in races]
+    return keys
+
+
+def count_submission(conn: sqlite3.Connection, lang: str, payload: dict) -> None:
+    """Add a new submission to the dashboard counters (same transaction as the insert)."""
+    columns, _, races = normalize_payload(payload)
+    conn.executemany(
+        "INSERT INTO enrollment_counts(school, dimension, value, count) VALUES(?, ?, ?, 1)"
+        " ON CONFLICT(dimension, value, school) DO UPDATE SET count = count + 1",
+        _count_keys(submission_columns(payload)["school"], lang, columns, races),
+    )
+
+
+def rebuild_enrollment_counts(conn: sqlite3.Connection) -> int:
+    """Recount the dashboard from the typed columns and race rows (no payload decoding); caller commits.
+
+    Returns the number of submissions counted.
+    """
+    counts = Counter()
+    typed = ", ".join(col for col, _ in TYPED_COLUMNS if col != "home_language")
+    for r in conn.execute(
+        f"SELECT school, lang, {typed}, COUNT(*) AS n FROM submissions GROUP BY school, lang, {typed}"
+    ):
+        for key in _count_keys(r["school"], r["lang"], r, ()):
+            counts[key] += r["n"]
+    for school, race, n in conn.execute(
         """
-        INSERT INTO submissions(
-            submission_id, created_at, lang, school,
-            student_first, student_last, dob,
-            parent_name, parent_email, parent_phone,
-            payload_json
-        ) VALUES(?,?,?,?,?,?,?,?,?,?,?)
-        """,
-        (
-            submission_id,
-            now.isoformat(timespec="seconds"),
-            lang,
-            data.get("school"),
-            data.get("student_first"),
-            data.get("student_last"),
-            data.get("dob"),
-            data.get("parent_name"),
-            parent_email,
-            data.get("parent_phone"),
-            json.dumps(payload, ensure_ascii=False),
-        ),
+        SELECT s.school, r.race, COUNT(*) FROM submission_races r JOIN submissions s ON s.id = r.submission_row
+        GROUP BY s.school, r.race
+        """
+    ):
+        counts[(school or "", "race", race)] += n
+    conn.execute("DELETE FROM enrollment_counts")
+    conn.executemany(
+        "INSERT INTO enrollment_counts(school, dimension, value, count) VALUES(?, ?, ?, ?)",
+        [key + (n,) for key, n in counts.items()],
     )
-    conn.commit()
-    conn.close()
+    return sum(n for (_, dim, _), n in counts.items() if dim == "total")
+
+
+def dashboard_counts(conn: sqlite3.Connection) -> dict:
+    """{dimension: {value: {school: count}}} from enrollment_counts; its size depends on
+    the number of distinct values, not on the number of submissions."""
+    rollup = {dim: {} for dim in DASHBOARD_DIMENSIONS}
+    for school, dim, value, n in conn.execute("SELECT school, dimension, value, count FROM enrollment_counts"):
+        rollup.setdefault(dim, {}).setdefault(value, {})[school] = n
+    return rollup
+
+
+# Columns of submissions_fts -> payload keys folded into each one
+SEARCH_FIELDS = {
+    "student": ("first_name", "middle_name", "last_name", "student_first", "student_last", "submission_id"),
+    "parent": ("parent_name", "parent_email", "parent_cell", "parent_phone", "custody_type"),
+    "address": ("address1", "apt", "city", "state", "zip"),
+    "siblings": (),  # sibling{i}_name / sibling{i}_school, collected below
+    "history": (
+        "last_school", "last_school_city_state", "birth_state", "birth_country",
+        "az_school_details", "murphy_before_details", "preschool_details",
+    ),
+    "language": ("home_language",),
+}
+_SIBLING_SEARCH_KEY = re.compile(r"sibling\d+_(name|school)$")
+
+
+def search_document(payload: dict) -> list:
+    """Column values for submissions_fts, in SEARCH_FIELDS order."""
+    doc = [" ".join(str(payload[k]) for k in keys if payload.get(k)) for keys in SEARCH_FIELDS.values()]
+    siblings = " ".join(str(v) for k, v in payload.items() if v and _SIBLING_SEARCH_KEY.match(k))
+    doc[list(SEARCH_FIELDS).index("siblings")] = siblings
+    return doc
+
+
+def index_submission(conn: sqlite3.Connection, rowid: int, payload: dict) -> None:
+    conn.execute(
+        f"INSERT INTO submissions_fts(rowid, {', '.join(SEARCH_FIELDS)}) VALUES(?{', ?' * len(SEARCH_FIELDS)})",
+        [rowid] + search_document(payload),
+    )
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> int:
+    """Re-index every submission from its stored payload; caller commits."""
+    conn.execute("DELETE FROM submissions_fts")
+    cur = conn.execute(f"SELECT id, submission_id, {', '.join(FIELD_COLUMNS)}, payload_json FROM submissions")
+    count = 0
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return count
+        for r in rows:
+            payload = decode_payload(r["payload_json"], r, conn)
+            payload.update(submission_id=r["submission_id"])
+            index_submission(conn, r["id"], payload)
+        count += len(rows)
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: every word must match as a prefix.
+
+    ``siblings:perez`` restricts a word to one SEARCH_FIELDS column.
+    """
+    terms = []
+    for column, word in re.findall(r"(?:(\w+):)?(\w+)", text):
+        term = f'"{word}"*'
+        terms.append(f"{column}:{term}" if column in SEARCH_FIELDS else term)
+    return " ".join(terms)
+
+
+# Family linking: submissions that share enough blocking keys end up in one family.
+# Keys are "kind:value". Candidates are the families sharing a contact key (phone, email,
+# street address); each scores the summed weight of the kinds it shares (each kind counted
+# once) and is linked at FAMILY_MATCH_SCORE or more, e.g. phone + surname, address +
+# parent name, or address + a listed sibling.
+FAMILY_KEY_WEIGHTS = {"phone": 2, "email": 2, "addr": 2, "kin": 1, "parent": 1, "last": 1}
+FAMILY_MATCH_SCORE = 3
+FAMILY_BLOCK_LIMIT = 50  # a contact key shared by more families than this (e.g. an office phone) is ignored
+_CONTACT_FAMILY_KINDS = ("phone", "email", "addr")
+_NAME_PARTICLES = frozenset(("de", "del", "la", "las", "los", "y", "e", "da", "dos", "van", "von"))
+_STREET_DIRECTIONS = frozenset(("n", "s", "e", "w", "north", "south", "east", "west", "norte", "sur"))
+_NON_LETTER_RE = re.compile(r"[^a-z]")
+_SOUNDEX_CODES = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+
+def soundex(word: str) -> str:
+    """American Soundex of a folded word ('garcia' -> 'G620'); '' if it has no letters."""
+    word = _NON_LETTER_RE.sub("", word)
+    if not word:
+        return ""
+    codes = word.translate(_SOUNDEX_CODES)
+    out, prev = word[0].upper(), codes[0]
+    for ch, code in zip(word[1:], codes[1:]):
+        if code.isdigit() and code != prev:
+            out += code
+        if ch not in "hw":
+            prev = code
+    return (out + "000")[:4]
+
+
+def _name_tokens(value) -> list:
+    return [t for t in fold_name(value).split() if t not in _NAME_PARTICLES]
+
+
+def family_keys(data: dict) -> set:
+    """Blocking keys for one submission: parent phone/email, street address, phonetic
+    student and sibling names ("kid"/"sib"), parent name and student surname."""
+    cols = submission_columns(data)
+    keys = set()
+    phone = re.sub(r"\D", "", cols["parent_phone"] or "")[-10:]
+    if len(phone) >= 7:
+        keys.add(f"phone:{phone}")
+    email = (cols["parent_email"] or "").strip().lower()
+    if email:
+        keys.add(f"email:{email}")
+    street = [t for t in fold_name(data.get("address1")).split() if t not in _STREET_DIRECTIONS]
+    if data.get("zip") and len(street) >= 2 and street[0].isdigit():
+        apt = re.sub(r"\W", "", fold_name(data.get("apt")))
+        keys.add(f"addr:{data['zip']}|{street[0]}|{street[1]}|{apt}")
+    parent = _name_tokens(cols["parent_name"])
+    if parent:
+        keys.add(f"parent:{soundex(parent[0])}{soundex(parent[-1]) if len(parent) > 1 else ''}")
+    surnames = [soundex(t) for t in _name_tokens(cols["student_last"])]
+    if surnames:
+        keys.add(f"last:{surnames[0]}")
+    first = _name_tokens(cols["student_first"])
+    if first:
+        keys.update(f"kid:{soundex(first[0])}{s}" for s in surnames)
+    for i in range(1, MAX_SIBLINGS + 1):
+        name = data.get(f"sibling{i}_name")
+        sibling = _name_tokens(name) if name else None
+        if sibling:
+            # "Ana" alone is taken to share the student's surname(s)
+            sib_surnames = [soundex(t) for t in sibling[1:]] or surnames
+            keys.update(f"sib:{soundex(sibling[0])}{s}" for s in sib_surnames)
+    return keys
+
+
+def _family_kind(key: str) -> str:
+    kind = key.split(":", 1)[0]
+    return "kin" if kind in ("kid", "sib") else kind
+
+
+def _family_probes(keys: set) -> tuple:
+    """(contact, supporting) keys to look up for a submission's keys.
+
+    A student ("kid") supports families that list them as a sibling, and a listed
+    sibling supports that student's own submission or another listing of them.
+    """
+    contact, supporting = set(), set()
+    for key in keys:
+        kind, value = key.split(":", 1)
+        if kind == "kid":
+            supporting.add(f"sib:{value}")
+        elif kind == "sib":
+            supporting.update((f"kid:{value}", key))
+        elif kind in _CONTACT_FAMILY_KINDS:
+            contact.add(key)
+        else:
+            supporting.add(key)
+    return contact, supporting
+
+
+def _linked_families(matched: dict) -> list:
+    """Candidate families (id -> set of shared keys) that score high enough, lowest id first."""
+    return sorted(
+        family for family, shared in matched.items()
+        if sum(FAMILY_KEY_WEIGHTS[kind] for kind in {_family_kind(k) for k in shared}) >= FAMILY_MATCH_SCORE
+    )
+
+
+def link_family(conn: sqlite3.Connection, rowid: int, payload: dict) -> int:
+    """Attach a new submission to its family (merging families it bridges); returns the family id.
+
+    Family ids are the lowest submissions.id in the family. Only contact keys are
+    looked up in ``family_keys``; name keys are checked against those candidates.
+    """
+    keys = family_keys(payload)
+    contact, supporting = _family_probes(keys)
+    matched = {}
+    for key in contact:
+        families = conn.execute(
+            "SELECT family_id FROM family_keys WHERE key = ? LIMIT ?", (key, FAMILY_BLOCK_LIMIT + 1)
+        ).fetchall()
+        if len(families) <= FAMILY_BLOCK_LIMIT:
+            for (family,) in families:
+                matched.setdefault(family, set()).add(key)
+    if matched and supporting:
+        rows = conn.execute(
+            f"SELECT family_id, key FROM family_keys WHERE key IN ({', '.join('?' * len(supporting))})"
+            f" AND family_id IN ({', '.join('?' * len(matched))})",
+            (*supporting, *matched),
+        )
+        for family, key in rows:
+            matched[family].add(key)
+    linked = _linked_families(matched)
+    family = linked[0] if linked else rowid
+    for other in linked[1:]:
+        conn.execute("UPDATE submission_families SET family_id = ? WHERE family_id = ?", (family, other))
+        conn.execute("UPDATE OR IGNORE family_keys SET family_id = ? WHERE family_id = ?", (family, other))
+        conn.execute("DELETE FROM family_keys WHERE family_id = ?", (other,))
+    conn.execute("INSERT INTO submission_families(submission_row, family_id) VALUES(?, ?)", (rowid, family))
+    conn.executemany("INSERT OR IGNORE INTO family_keys(key, family_id) VALUES(?, ?)", [(k, family) for k in keys])
+    return family
+
+
+def rebuild_family_links(conn: sqlite3.Connection) -> tuple:
+    """Re-link every submission, oldest first, in memory; caller commits. Returns (rows, families).
+
+    Same matching as link_family (so the result equals inserting the rows one by
+    one), with the blocking index and union-find kept in dicts.
+    """
+    merged_into = {}
+
+    def find(family: int) -> int:
+        root = family
+        while root in merged_into:
+            root = merged_into[root]
+        while family != root:
+            merged_into[family], family = root, merged_into[family]
+        return root
+
+    blocks, family_key_sets, assigned = {}, {}, []
+    cur = conn.execute(f"SELECT id, {', '.join(FIELD_COLUMNS)}, payload_json FROM submissions ORDER BY id")
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            break
+        for r in rows:
+            keys = family_keys(decode_payload(r["payload_json"], r, conn))
+            contact, supporting = _family_probes(keys)
+            matched = {}
+            for key in contact:
+                block = blocks.get(key)
+                if not block:
+                    continue
+                families = {find(f) for f in block}
+                if len(families) != len(block):
+                    blocks[key] = families
+                if len(families) <= FAMILY_BLOCK_LIMIT:
+                    for family in families:
+                        matched.setdefault(family, set()).add(key)
+            for family, shared in matched.items():
+                shared.update(supporting & family_key_sets[family])
+            linked = _linked_families(matched)
+            family = linked[0] if linked else r["id"]
+            for other in linked[1:]:
+                merged_into[other] = family
+                family_key_sets[family] |= family_key_sets.pop(other)
+            family_key_sets.setdefault(family, set()).update(keys)
+            for key in keys:
+                blocks.setdefault(key, set()).add(family)
+            assigned.append((r["id"], family))
+
+    conn.execute("DELETE FROM submission_families")
+    conn.execute("DELETE FROM family_keys")
+    conn.executemany(
+        "INSERT INTO submission_families(submission_row, family_id) VALUES(?, ?)",
+        [(row, find(family)) for row, family in assigned],
+    )
+    conn.executemany(
+        "INSERT INTO family_keys(key, family_id) VALUES(?, ?)",
+        [(key, family) for family, keys in family_key_sets.items() for key in keys],
+    )
+    return len(assigned), len(family_key_sets)
+
+
+class SmtpPool:
+    """Keeps authenticated SMTP sessions open between sends.
+
+    A session is reused for up to SMTP_MAX_MESSAGES messages, checked with NOOP
+    when it has been idle longer than SMTP_NOOP_AFTER, dropped after
+    SMTP_MAX_IDLE, and transparently reopened if the relay hung up.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._idle = []  # [server, messages_sent, last_used]
+        self._pid = os.getpid()
+        self.connects = 0
+        self.reuses = 0
+        self.noops = 0
+        self.reconnects = 0
+
+    def _open(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_USE_TLS:
+            server.starttls()
+        if SMTP_USERNAME:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        with self._lock:
+            self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self) -> list:
+        while True:
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Forked worker: sockets belong to the parent.
+                    self._idle.clear()
+                    self._pid = os.getpid()
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return [self._open(), 0, time.monotonic()]
+            idle = time.monotonic() - session[2]
+            if idle > SMTP_MAX_IDLE:
+                self._close(session[0])
+                continue
+            if idle > SMTP_NOOP_AFTER:
+                with self._lock:
+                    self.noops += 1
+                try:
+                    ok = session[0].noop()[0] == 250
+                except (smtplib.SMTPException, OSError):
+                    ok = False
+                if not ok:
+                    self._close(session[0])
+                    continue
+            with self._lock:
+                self.reuses += 1
+            return session
+
+    def _checkin(self, session: list) -> None:
+        session[2] = time.monotonic()
+        if session[1] >= SMTP_MAX_MESSAGES:
+            self._close(session[0])
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(session)
+                return
+        self._close(session[0])
+
+    def send(self, msg: EmailMessage) -> None:
+        with METRICS.timer("enroll_smtp_send_seconds"):
+            self._send(msg)
+
+    def _send(self, msg: EmailMessage) -> None:
+        session = self._checkout()
+        try:
+            session[0].send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Stale session: reconnect once and retry on a fresh one.
+            self._close(session[0])
+            with self._lock:
+                self.reconnects += 1
+            session = [self._open(), 0, time.monotonic()]
+            try:
+                session[0].send_message(msg)
+            except Exception:
+                self._close(session[0])
+                raise
+        except Exception:
+            self._close(session[0])
+            raise
+        session[1] += 1
+        self._checkin(session)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle_sessions": len(self._idle),
+                "connects": self.connects,
+                "reuses": self.reuses,
+                "noops": self.noops,
+                "reconnects": self.reconnects,
+            }
+
+
+SMTP_POOL = SmtpPool(SMTP_POOL_SIZE)
+
+
+def send_email(to_addr: str, subject: str, body: str) -> None:
+    if not SMTP_HOST or not to_addr:
+        return
+
+    msg = EmailMessage()
+    msg["From"] = FROM_EMAIL
+    msg["To"] = to_addr
+    msg["Subject"] = subject
+    msg.set_content(body)
+
+    SMTP_POOL.send(msg)
+
+
+def notification_emails(submission_id: str, lang: str, data: dict) -> list:
+    """(to, subject, body, kind) for the internal notification and the parent confirmation."""
+    data = submission_columns(data)
+    parent_email = (data.get("parent_email") or "").strip()
+    emails = []
 
-    # Emails
     # Internal notification (demo = Allen)
     if INTERNAL_NOTIFY_EMAIL:
         subj = f"New Enrollment Submission: {data.get('student_last')}, {data.get('student_first')} ({data.get('school')})"
@@ -450,7 +2030,7 @@ def enroll():
             f"Parent Email: {parent_email or '(not provided)'}\n\n"
             "(Demo mode) Full payload stored locally in the staging DB."
         )
-        send_email(INTERNAL_NOTIFY_EMAIL, subj, body)
+        emails.append((INTERNAL_NOTIFY_EMAIL, subj, body, "digest" if NOTIFY_DIGEST_INTERVAL > 0 else "single"))
 
     # Parent confirmation if email provided
     if parent_email:
@@ -463,12 +2043,560 @@ def enroll():
             + f"School: {data.get('school')}\n\n"
             + ("Next steps: Please bring required documents to the school front office.\n" if lang == "en" else "Próximos pasos: Por favor traiga los documentos requeridos a la oficina de la escuela.\n")
         )
-        send_email(parent_email, subj, body)
+        emails.append((parent_email, subj, body, "single"))
+
+    return emails
+
+
+def enqueue_email(conn: sqlite3.Connection, submission_id: str, to_addr: str, subject: str, body: str, kind: str = "single") -> None:
+    """Queue a message in the outbox; runs in the caller's transaction.
+
+    ``kind='digest'`` messages are held for NOTIFY_DIGEST_INTERVAL and then
+    sent together as one email per recipient.
+    """
+    if not SMTP_HOST or not to_addr:
+        return
+    due = time.time() + (NOTIFY_DIGEST_INTERVAL if kind == "digest" else 0)
+    conn.execute(
+        "INSERT INTO outbox(created_at, submission_id, to_addr, subject, body, kind, next_attempt_at) VALUES(?,?,?,?,?,?,?)",
+        (datetime.now().isoformat(timespec="seconds"), submission_id, to_addr, subject, body, kind, due),
+    )
+
+
+def _claim_outbox(conn: sqlite3.Connection, limit: int) -> list:
+    # Claimed rows are leased: if this worker dies mid-send they become due again.
+    now = time.time()
+    return conn.execute(
+        """
+        UPDATE outbox SET status='sending', attempts=attempts+1, next_attempt_at=?
+        WHERE id IN (
+            SELECT id FROM outbox
+            WHERE kind='single' AND status IN ('pending', 'sending') AND next_attempt_at <= ?
+            ORDER BY next_attempt_at LIMIT ?
+        )
+        RETURNING id, to_addr, subject, body, attempts
+        """,
+        (now + OUTBOX_LEASE, now, limit),
+    ).fetchall()
+
+
+def _claim_digest(conn: sqlite3.Connection) -> list:
+    # Once the oldest held notification is due, everything queued behind it rides along.
+    now = time.time()
+    due = conn.execute(
+        "SELECT 1 FROM outbox WHERE kind='digest' AND status IN ('pending', 'sending') AND next_attempt_at <= ? LIMIT 1",
+        (now,),
+    ).fetchone()
+    if due is None:
+        return []
+    return conn.execute(
+        """
+        UPDATE outbox SET status='sending', attempts=attempts+1, next_attempt_at=?
+        WHERE id IN (
+            SELECT id FROM outbox
+            WHERE kind='digest' AND (status='pending' OR (status='sending' AND next_attempt_at <= ?))
+            ORDER BY id LIMIT ?
+        )
+        RETURNING id, to_addr, subject, body, attempts
+        """,
+        (now + OUTBOX_LEASE, now, NOTIFY_DIGEST_MAX),
+    ).fetchall()
+
+
+def _digest_deliveries(rows: list) -> list:
+    """Group held notifications into one (rows, to, subject, body) delivery per recipient."""
+    by_addr = {}
+    for row in sorted(rows, key=lambda r: r["id"]):
+        by_addr.setdefault(row["to_addr"], []).append(row)
+    deliveries = []
+    for to_addr, group in by_addr.items():
+        subject = f"Enrollment digest: {len(group)} new submission(s)"
+        body = ("\n\n" + "-" * 40 + "\n\n").join(f"{r['subject']}\n\n{r['body']}" for r in group)
+        deliveries.append((group, to_addr, subject, body))
+    return deliveries
+
+
+def _settle_outbox(conn: sqlite3.Connection, msg_id: int, attempts: int, error) -> str:
+    if error is None:
+        conn.execute(
+            "UPDATE outbox SET status='sent', sent_at=?, last_error=NULL WHERE id=?",
+            (datetime.now().isoformat(timespec="seconds"), msg_id),
+        )
+        return "sent"
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        conn.execute("UPDATE outbox SET status='dead', last_error=? WHERE id=?", (error, msg_id))
+        return "dead"
+    delay = min(OUTBOX_BACKOFF * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    conn.execute(
+        "UPDATE outbox SET status='pending', next_attempt_at=?, last_error=? WHERE id=?",
+        (time.time() + delay, error, msg_id),
+    )
+    return "retry"
+
+
+class OutboxWorker:
+    """Drains the outbox table in a daemon thread and keeps send metrics.
+
+    Retries failed sends with exponential backoff and dead-letters a message
+    (status='dead') after OUTBOX_MAX_ATTEMPTS. Several processes can drain the
+    same outbox safely because messages are claimed with a leased UPDATE.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.send_seconds = 0.0
+        self.max_send_seconds = 0.0
+
+    def ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.run_forever, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        while True:
+            try:
+                while self.drain() == OUTBOX_BATCH:
+                    pass
+            except Exception:  # keep the worker alive; the next pass retries
+                app.logger.exception("outbox worker error")
+            self._wake.wait(OUTBOX_POLL_INTERVAL)
+            self._wake.clear()
+
+    def drain(self, limit: int = OUTBOX_BATCH) -> int:
+        """Send one batch of due messages; returns how many single messages were claimed."""
+        with POOL.connection() as conn:
+            batch = run_write(conn, _claim_outbox, limit)
+            held = run_write(conn, _claim_digest) if NOTIFY_DIGEST_INTERVAL > 0 else []
+        deliveries = [([row], row["to_addr"], row["subject"], row["body"]) for row in batch]
+        deliveries += _digest_deliveries(held)
+        # No pooled connection is held while talking to the SMTP relay; the
+        # sends themselves share SMTP_POOL sessions.
+        results = []
+        for rows, to_addr, subject, body in deliveries:
+            start = time.perf_counter()
+            try:
+                send_email(to_addr, subject, body)
+                error = None
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            elapsed = time.perf_counter() - start
+            results.extend((row["id"], row["attempts"], error, elapsed) for row in rows)
+        if results:
+            with POOL.connection() as conn:
+                outcomes = run_write(conn, lambda c: [_settle_outbox(c, *r[:3]) for r in results])
+            with self._lock:
+                for (_, _, _, elapsed), outcome in zip(results, outcomes):
+                    self.send_seconds += elapsed
+                    self.max_send_seconds = max(self.max_send_seconds, elapsed)
+                    if outcome == "sent":
+                        self.sent += 1
+                    elif outcome == "dead":
+                        self.dead += 1
+                    else:
+                        self.retried += 1
+        return len(batch)
+
+    def stats(self, conn: sqlite3.Connection) -> dict:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {
+            "queue_depth": counts.get("pending", 0) + counts.get("sending", 0),
+            "dead_letters": counts.get("dead", 0),
+            "sent_total": counts.get("sent", 0),
+            **self.process_stats(),
+        }
+
+    def process_stats(self) -> dict:
+        """This process's sender counters (stats() adds the queue counts shared by all processes)."""
+        with self._lock:
+            attempts = self.sent + self.retried + self.dead
+            return {
+                "worker_alive": bool(self._thread and self._thread.is_alive()),
+                "sent": self.sent,
+                "retried": self.retried,
+                "dead": self.dead,
+                "avg_send_ms": round(1000 * self.send_seconds / attempts, 3) if attempts else 0.0,
+                "max_send_ms": round(1000 * self.max_send_seconds, 3),
+                "smtp": SMTP_POOL.stats(),
+            }
+
+
+OUTBOX = OutboxWorker()
+
+
+def require_admin():
+    if not ADMIN_PASSWORD:
+        abort(404)
+    pw = request.args.get("pw") or request.headers.get("X-Admin-PW")
+    if pw != ADMIN_PASSWORD:
+        abort(401)
+
+
+def require_intake():
+    if not INTAKE_API_TOKEN:
+        abort(404)
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else request.headers.get("X-Intake-Token")
+    if token != INTAKE_API_TOKEN:
+        abort(401)
+
+
+def wake_outbox() -> None:
+    """Emails are queued in the submission transaction; nudge the worker after commit."""
+    if OUTBOX_WORKER == "thread":
+        OUTBOX.ensure_started()
+    OUTBOX.wake()
+
+
+app = Flask(__name__)
+app.secret_key = APP_SECRET
+
+
+def init_app(start_outbox: bool = False) -> Flask:
+    """Create/migrate the database and return the module's WSGI app.
+
+    This is not a factory: ``app`` and its pools, caches and metrics are
+    module-level, so there is one app per process. Call once per deployment before serving (wsgi.py does; under gunicorn with
+    ``preload_app`` that is once in the master, before workers fork). The
+    outbox thread is per process, so pre-fork servers start it in each worker
+    instead (see gunicorn.conf.py).
+    """
+    init_db()
+    if start_outbox and OUTBOX_WORKER == "thread":
+        OUTBOX.ensure_started()
+    return app
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        POOL.release(conn)
+
+
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def _observe_request(resp):
+    start = g.pop("request_start", None)
+    if start is not None:
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        METRICS.observe(
+            "enroll_request_seconds", time.perf_counter() - start,
+            route=rule, method=request.method, status=str(resp.status_code),
+        )
+    return resp
+
+
+# Hooks are only installed when metrics are on, so the disabled path adds no per-request work.
+if METRICS.enabled:
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    before_render_template.connect(METRICS.template_started, app)
+    template_rendered.connect(METRICS.template_finished, app)
+
+
+def form_context(lang: str) -> dict:
+    """Template arguments for enroll.html that depend only on the language."""
+    return {
+        "lang": lang,
+        "labels": LABELS[lang],
+        "schools": SCHOOLS,
+        "race_options": RACE_OPTIONS_EN if lang == "en" else RACE_OPTIONS_ES,
+        "custody_options": CUSTODY_OPTIONS_EN if lang == "en" else CUSTODY_OPTIONS_ES,
+        "transport_options": TRANSPORT_OPTIONS_EN if lang == "en" else TRANSPORT_OPTIONS_ES,
+    }
+
+
+class FormPageCache:
+    """Rendered blank enroll.html per language, with a content-hash ETag.
+
+    Labels and option lists are module constants, so the page only changes
+    when a template file does; entries are dropped when any template mtime
+    moves.
+    """
+
+    TEMPLATES = ("enroll.html", "base.html")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}  # lang -> (html, etag)
+        self._stamp = None
+        self.hits = 0
+        self.misses = 0
+
+    def _template_stamp(self) -> tuple:
+        folder = os.path.join(app.root_path, app.template_folder)
+        return tuple(os.stat(os.path.join(folder, name)).st_mtime_ns for name in self.TEMPLATES)
+
+    def page(self, lang: str) -> tuple:
+        stamp = self._template_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._pages.clear()
+                self._stamp = stamp
+            cached = self._pages.get(lang)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        html = render_template("enroll.html", values={}, email_warning=False, **form_context(lang))
+        etag = hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+        with self._lock:
+            self.misses += 1
+            self._pages[lang] = (html, etag)
+        return html, etag
+
+
+FORM_PAGES = FormPageCache()
+
+
+CONFIRMATION_COLUMNS = ("submission_id", "created_at", "school", "student_first", "student_last", "dob", "parent_name")
+
+
+def confirmation_view(values) -> dict:
+    """What success.html shows, from a submissions row or the same keys at insert time."""
+    return {
+        "submission_id": values["submission_id"],
+        "created_at": values["created_at"],
+        "school_label": SCHOOL_NAMES.get(values["school"], values["school"]),
+        "student_first_name": values["student_first"],
+        "student_last_name": values["student_last"],
+        "dob": values["dob"],
+        "parent_name": values["parent_name"],
+    }
+
+
+class ConfirmationCache:
+    """Bounded LRU of confirmation-page data with a per-entry TTL.
+
+    Filled right after a submission commits, so the redirect to /success
+    and the parent's refreshes of it don't touch the database. Entries are
+    per process; a miss falls back to a narrow query and is cached too.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # submission_id -> (expires_at, view)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, submission_id: str):
+        if self.size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(submission_id)
+            if item is not None and item[0] > now:
+                self._items.move_to_end(submission_id)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._items[submission_id]
+            self.misses += 1
+        return None
+
+    def put(self, submission_id: str, view: dict) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[submission_id] = (time.monotonic() + self.ttl, view)
+            self._items.move_to_end(submission_id)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self.size,
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+CONFIRMATIONS = ConfirmationCache(SUCCESS_CACHE_SIZE, SUCCESS_CACHE_TTL)
+
+
+def enroll_form_page(lang: str) -> Response:
+    if not ENROLL_PAGE_CACHE:
+        return Response(render_template("enroll.html", values={}, email_warning=False, **form_context(lang)), mimetype="text/html")
+    html, etag = FORM_PAGES.page(lang)
+    resp = Response(html, mimetype="text/html")
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = ENROLL_PAGE_MAX_AGE
+    return resp.make_conditional(request)
+
+
+@app.route("/")
+def home():
+    return redirect(url_for("enroll", lang=request.args.get("lang", "en")))
+
+
+@app.route("/enroll", methods=["GET", "POST"])
+def enroll():
+    lang = request.args.get("lang", "en")
+    if lang not in ("en", "es"):
+        lang = "en"
+
+    if request.method == "GET":
+        return enroll_form_page(lang)
+
+    # Single validation pass; the page is re-rendered at most once.
+    data, errors = validate_form(request.form)
+    token = submit_token(request.form.get("submission_token"))
+
+    if errors:
+        return render_template(
+            "enroll.html",
+            values=data,
+            errors=error_messages(errors, lang),
+            email_warning=False,
+            submission_token=token,
+            **form_context(lang),
+        ), 400
+
+    # Email warning flow
+    parent_email = data.get("parent_email", "")
+    email_skip_confirmed = request.form.get("email_skip_confirmed") == "1"
+    if not parent_email and not email_skip_confirmed:
+        # Render same page with warning modal
+        return render_template(
+            "enroll.html",
+            values=data,
+            formdata=[(k, v) for k, v in request.form.items(multi=True) if k != "email_skip_confirmed"],
+            email_warning=True,
+            submission_token=token,
+            **form_context(lang),
+        )
+
+    # Create submission: replay check, ID allocation and insert share one transaction / one commit.
+    # A replay of this form (double click, refresh, resend) redirects to the original confirmation.
+    now = datetime.now()
+    submission_id, created = run_write(
+        db(),
+        submit_enrollment,
+        now,
+        lang,
+        data,
+        token,
+    )
+    if created:
+        CONFIRMATIONS.put(submission_id, confirmation_view({
+            **submission_columns(data),
+            "submission_id": submission_id,
+            "created_at": now.isoformat(timespec="seconds"),
+        }))
+        wake_outbox()
 
     # Success page
     return redirect(url_for("success", submission_id=submission_id, lang=lang))
 
 
+def _insert_batch(conn: sqlite3.Connection, now: datetime, items: list) -> list:
+    """submit_enrollment for each ``(lang, clean, token)``; returns ``(submission_id, created)`` per item."""
+    return [submit_enrollment(conn, now, lang, clean, token) for lang, clean, token in items]
+
+
+@app.route("/api/submissions", methods=["POST"])
+def api_submissions():
+    """Create one submission (JSON object) or a batch (JSON array) in one transaction.
+
+    Each item is a form-field object, optionally with ``"lang": "es"`` and a
+    ``"submission_token"``; a replay gets the original ``submission_id`` back
+    with ``"duplicate": true``.
+    Valid items are inserted together with a single commit and invalid ones
+    are reported; with ``?atomic=true`` any invalid item rejects the batch.
+    Responds with one result per item, in request order: 201 when all were
+    created, 207 when some were, 422 when none were.
+    """
+    require_intake()
+    body = request.get_json(silent=True)
+    single = isinstance(body, dict)
+    items = [body] if single else body
+    if not isinstance(items, list) or not items or len(items) > INTAKE_MAX_BATCH:
+        abort(400)
+
+    results, valid = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"ok": False, "errors": {"": {"code": "invalid", "message": "not an object"}}})
+            continue
+        lang = item.get("lang") if item.get("lang") in ("en", "es") else "en"
+        clean, errors = validate_form(item)
+        if errors:
+            results.append({"ok": False, "errors": error_details(errors, lang)})
+        else:
+            results.append({"ok": True})
+            valid.append((len(results) - 1, lang, clean, submit_token(item.get("submission_token"))))
+
+    atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+    if valid and not (atomic and len(valid) < len(items)):
+        now = datetime.now()
+        outcomes = run_write(
+            db(),
+            _insert_batch,
+            now,
+            [item[1:] for item in valid],
+        )
+        for (index, *_), (submission_id, created) in zip(valid, outcomes):
+            results[index]["submission_id"] = submission_id
+            if not created:
+                results[index]["duplicate"] = True
+        wake_outbox()
+    elif valid:
+        for index, *_ in valid:
+            results[index] = {"ok": False, "errors": {}, "skipped": True}
+
+    created = sum(1 for r in results if r.get("submission_id"))
+    status = 201 if created == len(results) else 207 if created else 422
+    if single:
+        return jsonify(results[0]), status
+    return jsonify({"created": created, "results": results}), status
+
+
+@app.route("/api/validate", methods=["POST"])
+def api_validate():
+    """Validate a form (JSON object or form-encoded) without submitting it.
+
+    ``?field=a&field=b`` limits the reported errors to the fields the user
+    has touched, so the browser can validate incrementally.
+    """
+    lang = request.args.get("lang", "en")
+    if lang not in ("en", "es"):
+        lang = "en"
+    raw = request.get_json(silent=True) if request.is_json else request.form
+    if not isinstance(raw, dict):
+        abort(400)
+    _, errors = validate_form(raw)
+    only = request.args.getlist("field")
+    if only:
+        errors = {k: v for k, v in errors.items() if k in only}
+    return jsonify({
+        "ok": not errors,
+        "errors": error_details(errors, lang),
+    })
+
+
 @app.route("/success/<submission_id>")
 def success(submission_id: str):
     lang = request.args.get("lang", "en")
@@ -476,83 +2604,841 @@ def success(submission_id: str):
         lang = "en"
     labels = LABELS[lang]
 
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM submissions WHERE submission_id=?", (submission_id,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        abort(404)
+    submission = CONFIRMATIONS.get(submission_id)
+    if submission is None:
+        row = db().execute(
+            f"SELECT {', '.join(CONFIRMATION_COLUMNS)} FROM submissions WHERE submission_id=?",
+            (submission_id,),
+        ).fetchone()
+        if not row:
+            abort(404)
+        submission = confirmation_view(row)
+        CONFIRMATIONS.put(submission_id, submission)
+
+    return render_template("success.html", lang=lang, labels=labels, submission=submission)
+
+
+ADMIN_FILTERS = ("school", "form_lang", "from", "to", "dob", "q")
 
-    safe = {
-        "submission_id": row["submission_id"],
-        "created_at": row["created_at"],
-        "school": row["school"],
-        "student_first": row["student_first"],
-        "student_last": row["student_last"],
-        "dob": row["dob"],
-        "parent_name": row["parent_name"],
-        "parent_email": row["parent_email"],
-    }
 
-    return render_template("success.html", lang=lang, labels=labels, safe=safe)
+def admin_where(filters: dict) -> tuple:
+    """WHERE clauses + params for the admin listing filters.
+
+    Each filter alone can use an index; combined, SQLite seeks on one and checks the others per row.
+    """
+    clauses, params = [], []
+    if filters.get("school"):
+        clauses.append("school = ?")
+        params.append(filters["school"])
+    if filters.get("form_lang"):
+        clauses.append("lang = ?")
+        params.append(filters["form_lang"])
+    if filters.get("from"):
+        clauses.append("created_at >= ?")
+        params.append(filters["from"])
+    if filters.get("to"):
+        # Inclusive end date: any timestamp on that day sorts before "<date>T~".
+        clauses.append("created_at <= ?")
+        params.append(filters["to"] + "T~")
+    if filters.get("dob"):
+        clauses.append("dob = ?")
+        params.append(filters["dob"])
+    if filters.get("q"):
+        # "Last, First" narrows both names; a single word matches either. Both sides are
+        # folded (fold_name), so "nunez" finds "Núñez"; folded text has no GLOB wildcards.
+        last, _, first = (fold_name(part) for part in filters["q"].partition(","))
+        if first:
+            clauses.append("last_folded GLOB ? AND first_folded GLOB ?")
+            params += [last + "*", first + "*"]
+        elif last:
+            clauses.append("(last_folded GLOB ? OR first_folded GLOB ?)")
+            params += [last + "*", last + "*"]
+        else:
+            clauses.append("0")  # only punctuation: matches no name
+    return clauses, params
 
 
 @app.route("/admin")
 def admin():
     require_admin()
     lang = request.args.get("lang", "en")
+    if lang not in ("en", "es"):
+        lang = "en"
+
+    filters = {k: (request.args.get(k) or "").strip() for k in ADMIN_FILTERS}
+    newest_first = request.args.get("sort") != "oldest"
+    try:
+        cursor = int(request.args["cursor"]) if request.args.get("cursor") else None
+        per_page = min(max(int(request.args.get("per_page", ADMIN_PAGE_SIZE)), 1), 200)
+    except ValueError:
+        abort(400)
+
+    # Keyset pagination: seek past the last id shown instead of OFFSET.
+    clauses, params = admin_where(filters)
+    if cursor is not None:
+        clauses.append("id < ?" if newest_first else "id > ?")
+        params.append(cursor)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = db().execute(
+        f"""
+        SELECT id, submission_id, created_at, lang, school, student_last, student_first, dob,
+               parent_name, parent_email, parent_phone, duplicate_of
+        FROM submissions {where}
+        ORDER BY id {'DESC' if newest_first else 'ASC'} LIMIT ?
+        """,
+        params + [per_page + 1],
+    ).fetchall()
+
+    next_url = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_url = url_for("admin", **{**request.args.to_dict(), "cursor": rows[-1]["id"]})
+    first_url = url_for("admin", **{k: v for k, v in request.args.items() if k != "cursor"})
+
+    return render_template(
+        "admin.html",
+        rows=rows,
+        lang=lang,
+        labels=LABELS[lang],
+        schools=SCHOOLS,
+        filters=filters,
+        sort="newest" if newest_first else "oldest",
+        next_url=next_url,
+        first_url=first_url if cursor is not None else None,
+    )
+
+
+@app.route("/admin/search")
+def admin_search():
+    """Ranked full-text search over submission payloads (JSON, ``q`` + ``page``)."""
+    require_admin()
+    query = fts_query(request.args.get("q", ""))
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", ADMIN_PAGE_SIZE)), 1), 200)
+    except ValueError:
+        abort(400)
+    if not query:
+        return jsonify({"q": "", "page": page, "results": [], "has_more": False})
+
+    rows = db().execute(
+        """
+        SELECT s.submission_id, s.created_at, s.school, s.student_last, s.student_first, s.dob,
+               s.parent_name, snippet(submissions_fts, -1, '[', ']', '…', 10) AS snippet,
+               bm25(submissions_fts) AS score
+        FROM submissions_fts JOIN submissions s ON s.id = submissions_fts.rowid
+        WHERE submissions_fts MATCH ?
+        ORDER BY score LIMIT ? OFFSET ?
+        """,
+        (query, per_page + 1, (page - 1) * per_page),
+    ).fetchall()
+    results = [dict(r) for r in rows[:per_page]]
+    return jsonify({"q": request.args.get("q", ""), "page": page, "results": results, "has_more": len(rows) > per_page})
+
+
+DASHBOARD_TITLES = {
+    "lang": "Form language", "grade": "Grade", "sex": "Sex", "transport": "Transportation",
+    "service": "Services", "race": "Race",
+}
+
+
+@app.route("/admin/dashboard")
+def admin_dashboard():
+    """Enrollment counts per school by language, grade, sex, transport, services and race.
+
+    Served from enrollment_counts, so the cost does not grow with the number
+    of submissions. ``?format=json`` returns the raw rollup.
+    """
+    require_admin()
+    rollup = dashboard_counts(db())
+    if request.args.get("format") == "json":
+        return jsonify(rollup)
+
+    schools = [key for key, _ in SCHOOLS]
+    schools += sorted({school for counts in rollup["total"].values() for school in counts} - set(schools))
+    value_labels = {
+        "lang": {"en": "English", "es": "Español"},
+        "sex": {"male": "Male", "female": "Female"},
+        "transport": dict(TRANSPORT_OPTIONS_EN),
+        "service": {flag: LABELS["en"][flag] for flag in SERVICE_FLAGS},
+        "race": dict(RACE_OPTIONS_EN),
+    }
+    sections = []
+    for dim in DASHBOARD_DIMENSIONS[1:]:
+        rows = [
+            (value_labels.get(dim, {}).get(value, value or "(blank)"), [counts.get(s, 0) for s in schools], sum(counts.values()))
+            for value, counts in rollup[dim].items()
+        ]
+        rows.sort(key=lambda row: (-row[2], row[0]))
+        sections.append((DASHBOARD_TITLES[dim], rows))
+    totals = rollup["total"].get("", {})
+    return render_template(
+        "dashboard.html",
+        lang="en",
+        labels=LABELS["en"],
+        schools=[SCHOOL_NAMES.get(s, s or "(none)") for s in schools],
+        totals=[totals.get(s, 0) for s in schools],
+        total=sum(totals.values()),
+        sections=sections,
+    )
+
+
+@app.route("/admin/family/<submission_id>")
+def admin_family(submission_id):
+    """The submissions linked into the same family as ``submission_id`` (JSON)."""
+    require_admin()
     conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT submission_id, created_at, lang, school, student_last, student_first, dob, parent_name, parent_email, parent_phone FROM submissions ORDER BY id DESC LIMIT 200")
-    rows = cur.fetchall()
-    conn.close()
-    return render_template("admin.html", rows=rows)
+    row = conn.execute(
+        """
+        SELECT f.family_id FROM submissions s JOIN submission_families f ON f.submission_row = s.id
+        WHERE s.submission_id = ?
+        """,
+        (submission_id,),
+    ).fetchone()
+    if row is None:
+        abort(404)
+    members = conn.execute(
+        """
+        SELECT s.submission_id, s.created_at, s.school, s.student_last, s.student_first, s.dob,
+               s.parent_name, s.parent_phone, s.parent_email
+        FROM submission_families f JOIN submissions s ON s.id = f.submission_row
+        WHERE f.family_id = ? ORDER BY s.id
+        """,
+        (row["family_id"],),
+    ).fetchall()
+    return jsonify({"submission_id": submission_id, "family_id": row["family_id"], "members": [dict(m) for m in members]})
+
+
+@app.route("/admin/db-stats")
+def db_stats():
+    require_admin()
+    return jsonify(POOL.stats())
+
+
+@app.route("/admin/cache-stats")
+def cache_stats():
+    require_admin()
+    return jsonify({
+        "form_pages": {"hits": FORM_PAGES.hits, "misses": FORM_PAGES.misses},
+        "confirmations": CONFIRMATIONS.stats(),
+    })
+
+
+@app.route("/admin/outbox-stats")
+def outbox_stats():
+    require_admin()
+    return jsonify(OUTBOX.stats(db()))
+
+
+# Monotonic counters among the *.stats() values; everything else is exported as a gauge.
+_COUNTER_STATS = {"hits", "misses", "waits", "timeouts", "checkouts", "connects", "reuses", "noops",
+                  "reconnects", "sent", "retried", "dead", "evictions"}
+
+
+def _stat_metrics(prefix: str, stats: dict) -> dict:
+    out = {}
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if not isinstance(value, (int, float)):
+            continue
+        if key in _COUNTER_STATS:
+            out[f"{prefix}_{key}_total"] = ("counter", value)
+        else:
+            out[f"{prefix}_{key}"] = ("gauge", value)
+    return out
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (same admin password as /admin)."""
+    require_admin()
+    if not METRICS.enabled:
+        abort(404)
+    outbox = OUTBOX.stats(db())
+    gauges = _stat_metrics("enroll_outbox", {k: outbox[k] for k in ("queue_depth", "dead_letters")})
+    return Response(METRICS.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+def process_metrics() -> dict:
+    """This process's pool, sender, SMTP and page-cache numbers (merged across workers by METRICS)."""
+    outbox = OUTBOX.process_stats()
+    return {
+        **_stat_metrics("enroll_db_pool", POOL.stats()),
+        **_stat_metrics("enroll_outbox", {k: v for k, v in outbox.items() if k != "smtp"}),
+        **_stat_metrics("enroll_smtp", outbox["smtp"]),
+        **_stat_metrics("enroll_form_page_cache", {"hits": FORM_PAGES.hits, "misses": FORM_PAGES.misses}),
+        **_stat_metrics("enroll_confirmation_cache", CONFIRMATIONS.stats()),
+    }
+
+
+METRICS.process_stats = process_metrics
+
+
+EXPORT_COLUMNS = [
+    "submission_id",
+    "created_at",
+    "lang",
+    "school",
+    "student_first",
+    "student_last",
+    "dob",
+    "parent_name",
+    "parent_email",
+    "parent_phone",
+    "payload_json",
+]
+
+
+def iter_csv(cur: sqlite3.Cursor, header: list, row_values):
+    """Yield UTF-8 CSV chunks, fetching EXPORT_CHUNK_ROWS rows at a time from ``cur``."""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if rows:
+            writer.writerows(row_values(r) for r in rows)
+        chunk = buf.getvalue()
+        if chunk:
+            yield chunk.encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+        if not rows:
+            break
+
+
+# Synergy SIS import layout for /admin/export-synergy.csv: one row per submission,
+# dates as MM/DD/YYYY, yes/no answers and service flags as Y/N, races as federal
+# codes in Race 1-5 and every sibling in its own group of columns.
+SYNERGY_RACE_CODES = {
+    "american_indian_alaska": "1",
+    "asian": "2",
+    "african_american": "3",
+    "hawaiian_pacific_islander": "4",
+    "white": "5",
+}
+SYNERGY_SERVICE_HEADERS = {
+    "sped": "Special Education", "plan504": "Section 504", "gifted": "Gifted",
+    "refugee": "Refugee", "migrant": "Migrant", "immigrant": "Immigrant",
+}
+SYNERGY_HEADER = [
+    "Submission ID", "Received Date", "Form Language", "School",
+    "Last Name", "First Name", "Middle Name", "Birth Date", "Gender", "Grade", "Birth State", "Birth Country",
+    "Residence Address", "Residence Apartment", "Residence City", "Residence State", "Residence Zip",
+    "Hispanic/Latino", "Tribal Affiliation", *(f"Race {i}" for i in range(1, len(SYNERGY_RACE_CODES) + 1)),
+    "Home Language", "Transportation", *(SYNERGY_SERVICE_HEADERS[flag] for flag in SERVICE_FLAGS),
+    "US Entry Date", "Temporary Address",
+    "Previous AZ School", "Previous AZ School Details", "Previous Murphy School", "Previous Murphy School Details",
+    "Preschool", "Preschool Details", "Last School", "Last School City/State",
+    "Expelled", "Suspended 10+ Days", "Considered for Expulsion",
+    "Custody", "Parent/Guardian Name", "Parent/Guardian Phone", "Parent/Guardian Email",
+    *(f"Sibling {i} {part}" for i in range(1, MAX_SIBLINGS + 1) for part in ("Name", "Grade", "School", "Lives With")),
+]
+# submissions columns read for each row, in cursor order
+SYNERGY_SOURCE_COLUMNS = ["submission_id", "created_at", "lang", *FIELD_COLUMNS, "payload_json"]
+_TRANSPORT_LABELS = dict(TRANSPORT_OPTIONS_EN)
+_GENDER_CODES = {"male": "M", "female": "F"}
+_YN = {"yes": "Y", "no": "N"}
+
+
+def _us_date(value) -> str:
+    value = value or ""
+    return f"{value[5:7]}/{value[8:10]}/{value[:4]}" if len(value) >= 10 and value[4] == "-" else value
+
+
+def _phone(value) -> str:
+    digits = re.sub(r"\D", "", value or "")
+    return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}" if len(digits) == 10 else (value or "")
+
+
+def synergy_record(row: dict) -> list:
+    """One SYNERGY_HEADER row from a submissions row (SYNERGY_SOURCE_COLUMNS as a dict)."""
+    p = decode_payload(row["payload_json"], row)
+    columns, siblings, races = normalize_payload(p)
+
+    def text(key):
+        value = p.get(key)
+        return value.strip() if isinstance(value, str) else ""
+
+    def yn(key):
+        return _YN.get(text(key).lower(), "")
+
+    def stored(column):
+        value = stored_value(row, p, column)
+        return value.strip() if isinstance(value, str) else ""
+
+    transport = columns["transport"] or ""
+    race_codes = [SYNERGY_RACE_CODES[r] for r in races]
+    sibling_cells = [""] * (4 * MAX_SIBLINGS)
+    for position, name, grade, school, lives in siblings:
+        sibling_cells[4 * (position - 1):4 * position] = [
+            name or "", grade or "", school or "", {1: "Y", 0: "N"}.get(lives, ""),
+        ]
+    school = row["school"] or ""
+    return [
+        row["submission_id"], _us_date(row["created_at"]), row["lang"], SCHOOL_NAMES.get(school, school),
+        stored("student_last"), stored("student_first"), text("middle_name"), _us_date(stored("dob")),
+        _GENDER_CODES.get(columns["sex"] or "", ""), columns["grade"] or "", text("birth_state"), text("birth_country"),
+        text("address1"), text("apt"), text("city"), text("state"), text("zip"),
+        yn("ethnicity"), yn("tribal_affiliation"), *race_codes, *[""] * (len(SYNERGY_RACE_CODES) - len(race_codes)),
+        columns["home_language"] or "",
+        text("transport_other") if transport == "other" else _TRANSPORT_LABELS.get(transport, transport),
+        *("Y" if columns[flag] else "N" for flag in SERVICE_FLAGS),
+        _us_date(text("entry_us")), yn("temp_address"),
+        yn("az_school"), text("az_school_details"), yn("murphy_before"), text("murphy_before_details"),
+        yn("preschool"), text("preschool_details"), text("last_school"), text("last_school_city_state"),
+        yn("expelled"), yn("suspended10"), yn("considered"),
+        text("custody_type"), stored("parent_name"), _phone(stored("parent_phone")), stored("parent_email"),
+        *sibling_cells,
+    ]
+
+
+def synergy_csv_chunk(rows: list, dicts: dict) -> bytes:
+    """UTF-8 CSV for a chunk of SYNERGY_SOURCE_COLUMNS tuples (runs in an export worker process)."""
+    PAYLOAD_DICTS.preload(dicts)
+    buf = StringIO()
+    csv.writer(buf).writerows(synergy_record(dict(zip(SYNERGY_SOURCE_COLUMNS, r))) for r in rows)
+    return buf.getvalue().encode("utf-8")
+
+
+class ExportWorkers:
+    """Process pool that transforms export chunks in parallel, results kept in order.
+
+    Created on first use in each process (a forked gunicorn worker builds its
+    own). Workers are spawned, not forked, because the web process runs
+    threads. At most two chunks per worker are in flight, so memory stays
+    bounded however large the export; with one worker chunks are transformed
+    in the calling thread.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers if workers > 0 else min(4, os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.chunks = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def map(self, fn, chunks, *args):
+        """Yield ``fn(chunk, *args)`` for each chunk, in order."""
+        if self.workers <= 1:
+            for chunk in chunks:
+                self.chunks += 1
+                yield fn(chunk, *args)
+            return
+        executor = self._get_executor()
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(fn, chunk, *args))
+                self.chunks += 1
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+EXPORT_POOL = ExportWorkers(EXPORT_WORKERS)
+
+
+def iter_synergy_csv(cur: sqlite3.Cursor, conn: sqlite3.Connection, pool: Optional[ExportWorkers] = None):
+    """Yield the Synergy CSV for ``cur`` (SYNERGY_SOURCE_COLUMNS rows), transformed in ``pool`` (EXPORT_POOL)."""
+    buf = StringIO()
+    csv.writer(buf).writerow(SYNERGY_HEADER)
+    yield buf.getvalue().encode("utf-8")
+    dicts = PAYLOAD_DICTS.snapshot(conn)
+
+    def chunks():
+        while True:
+            rows = cur.fetchmany(SYNERGY_CHUNK_ROWS)
+            if not rows:
+                return
+            yield [tuple(r) for r in rows]
+
+    yield from (pool or EXPORT_POOL).map(synergy_csv_chunk, chunks(), dicts)
+
+
+def export_cursor(conn: sqlite3.Connection, columns: list) -> tuple:
+    """``(cursor, headers)`` for a full export, or a delta when the request has ``since_id``.
+
+    Delta mode returns rows with ``id > since_id`` in id order (at most
+    ``limit`` of them) and puts the cursor for the next call in the
+    ``X-Export-Cursor`` header; the cursor is unchanged when nothing is new.
+    """
+    since_id = request.args.get("since_id")
+    if since_id is None:
+        return conn.execute(f"SELECT {', '.join(columns)} FROM submissions ORDER BY id DESC"), {}
+    try:
+        since_id = int(since_id)
+        limit = int(request.args.get("limit", 0))
+    except ValueError:
+        abort(400)
+    # Pin the upper bound first so the cursor matches exactly what is streamed.
+    if limit > 0:
+        row = conn.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM submissions WHERE id > ? ORDER BY id LIMIT ?)", (since_id, limit)
+        ).fetchone()
+    else:
+        row = conn.execute("SELECT MAX(id) FROM submissions WHERE id > ?", (since_id,)).fetchone()
+    upto = row[0] if row[0] is not None else since_id
+    cur = conn.execute(
+        f"SELECT {', '.join(columns)} FROM submissions WHERE id > ? AND id <= ? ORDER BY id",
+        (since_id, upto),
+    )
+    return cur, {"X-Export-Cursor": str(upto)}
 
 
 @app.route("/admin/export.csv")
 def export_csv():
+    """Full export, or a delta when ``since_id`` is given (see export_cursor)."""
     require_admin()
-    import csv
-    from io import StringIO
+    conn = db()
+    cur, headers = export_cursor(conn, EXPORT_COLUMNS)
+    headers["Content-Disposition"] = "attachment; filename=enrollment_export.csv"
+
+    def row_values(r):
+        return (*r[:-1], payload_text(r, conn))
+
+    return Response(
+        stream_with_context(iter_csv(cur, EXPORT_COLUMNS, row_values)),
+        mimetype="text/csv",
+        headers=headers,
+    )
 
+
+@app.route("/admin/export-synergy.csv")
+def export_synergy_csv():
+    """Submissions in the Synergy import layout (SYNERGY_HEADER); ``since_id``/``limit`` as for export.csv."""
+    require_admin()
     conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM submissions ORDER BY id DESC")
-    rows = cur.fetchall()
-    conn.close()
-
-    # Minimal export now; later we map to Synergy import fields.
-    out = StringIO()
-    writer = csv.writer(out)
-    writer.writerow([
-        "submission_id",
-        "created_at",
-        "lang",
-        "school",
-        "student_first",
-        "student_last",
-        "dob",
-        "parent_name",
-        "parent_email",
-        "parent_phone",
-        "payload_json",
+    cur, headers = export_cursor(conn, SYNERGY_SOURCE_COLUMNS)
+    headers["Content-Disposition"] = "attachment; filename=synergy_import.csv"
+    return Response(stream_with_context(iter_synergy_csv(cur, conn)), mimetype="text/csv", headers=headers)
+
+
+# Columnar export for analysis: one typed column per FORM_SCHEMA field (sibling
+# slots folded into a single list<struct> column), written with pyarrow when it
+# is installed. Nothing else in the app needs pyarrow, so it is imported lazily.
+_SIBLING_FIELD_NAMES = frozenset(f.name for i in range(1, MAX_SIBLINGS + 1) for f in _sibling_fields(i))
+PARQUET_FIELDS = [f for f in FORM_SCHEMA if f.name not in _SIBLING_FIELD_NAMES]
+
+
+def _pyarrow():
+    """``(pyarrow, pyarrow.parquet)``, or None when pyarrow is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+def parquet_schema(pa):
+    """Arrow schema of the Parquet export."""
+    kinds = {
+        "date": pa.date32(), "yesno": pa.bool_(), "flag": pa.bool_(),
+        "multi": pa.list_(pa.string()), "int": pa.int32(),
+    }
+    sibling = pa.struct([
+        ("position", pa.int8()), ("name", pa.string()), ("grade", pa.string()),
+        ("school", pa.string()), ("lives_with", pa.bool_()),
+    ])
+    return pa.schema([
+        pa.field("submission_id", pa.string(), nullable=False),
+        pa.field("received_at", pa.timestamp("s")),
+        pa.field("lang", pa.string()),
+        *(pa.field(f.name, kinds.get(f.kind, pa.string())) for f in PARQUET_FIELDS),
+        pa.field("siblings", pa.list_(sibling)),
     ])
-    for r in rows:
-        writer.writerow([
-            r["submission_id"], r["created_at"], r["lang"], r["school"],
-            r["student_first"], r["student_last"], r["dob"],
-            r["parent_name"], r["parent_email"], r["parent_phone"], r["payload_json"],
-        ])
 
-    csv_bytes = out.getvalue().encode("utf-8")
-    tmp_path = os.path.join(os.path.dirname(__file__), "export.csv")
-    with open(tmp_path, "wb") as f:
-        f.write(csv_bytes)
 
-    return send_file(tmp_path, mimetype="text/csv", as_attachment=True, download_name="enrollment_export.csv")
+def _iso(parse, value):
+    try:
+        return parse(value) if value else None
+    except ValueError:
+        return None
 
 
-if __name__ == "__main__":
+def parquet_row(row, conn: sqlite3.Connection) -> list:
+    """Values for one submissions row (SYNERGY_SOURCE_COLUMNS), in parquet_schema order."""
+    p = decode_payload(row["payload_json"], row, conn)
+    values = [row["submission_id"], _iso(datetime.fromisoformat, row["created_at"]), row["lang"]]
+    for f in PARQUET_FIELDS:
+        value = stored_value(row, p, f.column) if f.column else p.get(f.name)
+        if f.kind == "flag":
+            values.append(bool(value))
+        elif f.kind == "multi":
+            values.append([value] if isinstance(value, str) else list(value or []))
+        elif not isinstance(value, str) or not value.strip():
+            values.append(None)
+        elif f.kind == "yesno":
+            yes = _yes_no(value)
+            values.append(None if yes is None else bool(yes))
+        elif f.kind == "date":
+            values.append(_iso(date.fromisoformat, value.strip()))
+        elif f.kind == "int":
+            values.append(int(value) if value.strip().isdigit() else None)
+        else:
+            values.append(value.strip())
+    _, siblings, _ = normalize_payload(p)
+    values.append([
+        {"position": i, "name": name, "grade": grade, "school": school,
+         "lives_with": None if lives is None else bool(lives)}
+        for i, name, grade, school, lives in siblings
+    ])
+    return values
+
+
+class _ChunkSink:
+    """Write-only file object collecting ParquetWriter output until it is taken."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def iter_parquet(cur: sqlite3.Cursor, conn: sqlite3.Connection):
+    """Yield a zstd Parquet file for ``cur``, one row group per PARQUET_ROW_GROUP_ROWS rows.
+
+    Rows are fetched EXPORT_CHUNK_ROWS at a time and only the column values
+    of the current row group are held in memory; each finished row group is
+    yielded as soon as it is encoded, the footer last.
+    """
+    pa, pq = _pyarrow()
+    schema = parquet_schema(pa)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        columns = [[] for _ in schema.names]
+        count = 0
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+            for r in rows:
+                for column, value in zip(columns, parquet_row(r, conn)):
+                    column.append(value)
+            count += len(rows)
+            if count and (count >= PARQUET_ROW_GROUP_ROWS or not rows):
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+                ))
+                columns = [[] for _ in schema.names]
+                count = 0
+                yield sink.take()
+            if not rows:
+                break
+    yield sink.take()
+
+
+@app.route("/admin/export.parquet")
+def export_parquet():
+    """Typed columnar export (parquet_schema); ``since_id``/``limit`` as for export.csv. 501 without pyarrow."""
+    require_admin()
+    if _pyarrow() is None:
+        abort(501, description="The Parquet export needs pyarrow (pip install pyarrow).")
+    conn = db()
+    cur, headers = export_cursor(conn, SYNERGY_SOURCE_COLUMNS)
+    headers["Content-Disposition"] = "attachment; filename=enrollment.parquet"
+    return Response(
+        stream_with_context(iter_parquet(cur, conn)), mimetype="application/vnd.apache.parquet", headers=headers
+    )
+
+
+@app.cli.command("drain-outbox")
+@click.option("--once", is_flag=True, help="Send what is due now and exit.")
+def drain_outbox_command(once):
+    """Send queued emails from a separate process (use with OUTBOX_WORKER=off)."""
     init_db()
-    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=True)
+    if once:
+        total = 0
+        while True:
+            n = OUTBOX.drain()
+            total += n
+            if n < OUTBOX_BATCH:
+                break
+        click.echo(f"Processed {total} message(s).")
+        return
+    OUTBOX.run_forever()
+
+
+def export_to_file(out: str, since_id: int, chunks) -> tuple:
+    """Write rows with ``id > since_id`` oldest first; ``chunks(cur, conn)`` yields the file's bytes.
+
+    Returns ``(rows, upto, seconds)``; ``upto`` is the since-id for the next run.
+    """
+    init_db()
+    start = time.perf_counter()
+    with POOL.connection() as conn:
+        upto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM submissions").fetchone()[0]
+        count = conn.execute(
+            "SELECT COUNT(*) FROM submissions WHERE id > ? AND id <= ?", (since_id, upto)
+        ).fetchone()[0]
+        cur = conn.execute(
+            f"SELECT {', '.join(SYNERGY_SOURCE_COLUMNS)} FROM submissions WHERE id > ? AND id <= ? ORDER BY id",
+            (since_id, upto),
+        )
+        with open(out, "wb") as f:
+            for chunk in chunks(cur, conn):
+                f.write(chunk)
+    return count, upto, time.perf_counter() - start
+
+
+@app.cli.command("export-synergy")
+@click.option("--out", default="synergy_import.csv", show_default=True, help="CSV file to write.")
+@click.option("--since-id", type=int, default=0, show_default=True, help="Only rows with id > SINCE_ID.")
+@click.option("--workers", type=int, default=None, help="Transform processes (default: EXPORT_WORKERS).")
+def export_synergy_command(out, since_id, workers):
+    """Write submissions in the Synergy import layout, oldest first."""
+    pool = EXPORT_POOL if workers is None else ExportWorkers(workers)
+    try:
+        count, upto, elapsed = export_to_file(out, since_id, lambda cur, conn: iter_synergy_csv(cur, conn, pool))
+    finally:
+        pool.shutdown()
+    click.echo(f"Wrote {count} row(s) to {out} in {elapsed:.1f}s with {pool.workers} worker(s); next --since-id {upto}.")
+
+
+@app.cli.command("export-parquet")
+@click.option("--out", default="enrollment.parquet", show_default=True, help="Parquet file to write.")
+@click.option("--since-id", type=int, default=0, show_default=True, help="Only rows with id > SINCE_ID.")
+def export_parquet_command(out, since_id):
+    """Write submissions as a typed Parquet file (needs pyarrow), oldest first."""
+    if _pyarrow() is None:
+        raise click.ClickException("The Parquet export needs pyarrow (pip install pyarrow).")
+    count, upto, elapsed = export_to_file(out, since_id, iter_parquet)
+    click.echo(f"Wrote {count} row(s) to {out} in {elapsed:.1f}s ({os.path.getsize(out) / 1e6:.1f} MB); next --since-id {upto}.")
+
+
+@app.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Rebuild the full-text search index from stored submissions."""
+    init_db()
+    with POOL.connection() as conn:
+        count = run_write(conn, rebuild_search_index)
+    click.echo(f"Indexed {count} submission(s).")
+
+
+@app.cli.command("backfill-normalized")
+def backfill_normalized_command():
+    """Rebuild typed columns and the sibling/race tables from stored payloads."""
+    init_db()
+    with POOL.connection() as conn:
+        count = run_write(conn, backfill_normalized)
+    click.echo(f"Normalized {count} submission(s).")
+
+
+@app.cli.command("rebuild-dashboard")
+def rebuild_dashboard_command():
+    """Recount the /admin/dashboard rollups from the typed submission columns."""
+    init_db()
+    with POOL.connection() as conn:
+        count = run_write(conn, rebuild_enrollment_counts)
+    click.echo(f"Counted {count} submission(s).")
+
+
+@app.cli.command("rebuild-families")
+def rebuild_families_command():
+    """Re-link every submission into families from its stored payload."""
+    init_db()
+    start = time.perf_counter()
+    with POOL.connection() as conn:
+        count, families = run_write(conn, rebuild_family_links)
+    click.echo(f"Linked {count} submission(s) into {families} families in {time.perf_counter() - start:.1f}s.")
+
+
+@app.cli.command("load-synthetic")
+@click.option("--rows", type=int, default=100_000, show_default=True)
+@click.option("--batch", type=int, default=20_000, show_default=True, help="Rows per transaction.")
+@click.option("--year", type=int, default=0, help="Year in the submission IDs (default: this year).")
+@click.option("--days", type=int, default=30, show_default=True, help="Spread created_at over this many days.")
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--search/--no-search", default=True, help="Index rows for /admin/search while loading.")
+@click.option("--families/--no-families", default=True, help="Re-link families after loading.")
+def load_synthetic_command(rows, batch, year, days, seed, search, families):
+    """Bulk-load synthetic submissions for capacity testing (never on a real database)."""
+    import synthetic
+
+    init_db()
+    start = time.perf_counter()
+
+    def progress(done):
+        click.echo(f"  {done} rows, {done / (time.perf_counter() - start):,.0f} rows/s")
+
+    with POOL.connection() as conn:
+        count = synthetic.bulk_load(conn, rows, year=year, seed=seed, batch=batch, search=search, days=days,
+                                    progress=progress)
+        if families:
+            run_write(conn, rebuild_family_links)
+        size = db_size(conn)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Loaded {count} submission(s) in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s); database {size / 1e6:.1f} MB.")
+    if not search:
+        click.echo("Search index not updated; run `flask --app app rebuild-search` before using /admin/search.")
+    if not families:
+        click.echo("Family links not updated; run `flask --app app rebuild-families`.")
+
+
+@app.cli.command("compact-payloads")
+@click.option("--mode", type=click.Choice(["json", "compact", "zlib"]), default=None,
+              help="Target storage (default: PAYLOAD_STORAGE).")
+@click.option("--train/--no-train", default=True, help="Train a fresh zlib dictionary from current data first.")
+@click.option("--vacuum", is_flag=True, help="VACUUM afterwards to return freed pages to the OS.")
+def compact_payloads_command(mode, train, vacuum):
+    """Re-encode stored payload_json values into another storage mode."""
+    mode = mode or PAYLOAD_STORAGE
+    init_db()
+    with POOL.connection() as conn:
+        before = db_size(conn)
+        if mode == "zlib" and train:
+            dict_id = run_write(conn, train_payload_dict)
+            click.echo(f"Trained payload dictionary {dict_id}.")
+        count = recode_payloads(conn, mode)
+        if vacuum:
+            conn.execute("VACUUM")
+        after = db_size(conn)
+    click.echo(f"Re-encoded {count} submission(s) as {mode}; database {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB.")
+
+
+if __name__ == "__main__":
+    # Development server only; deploy with wsgi.py (see README).
+    debug = os.getenv("FLASK_DEBUG", "false").lower() in ("1", "true", "yes")
+    init_app(start_outbox=True).run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=debug)
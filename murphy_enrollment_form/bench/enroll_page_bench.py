@@ -0,0 +1,56 @@
+"""Requests/sec for GET /enroll with and without the rendered-page cache.
+
+Measures three cases through the Flask test client: a full Jinja render on
+every request (cache off), a cached 200, and a browser revalidation that
+comes back as 304 Not Modified.
+
+    python bench/enroll_page_bench.py --requests 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def run(client, n: int, headers=None) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        resp = client.get("/enroll?lang=" + ("en" if i % 2 else "es"), headers=headers or {})
+        resp.close()
+    return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import app as enrollment
+
+    client = enrollment.app.test_client()
+    results = {}
+
+    enrollment.ENROLL_PAGE_CACHE = False
+    run(client, 50)
+    results["render every time"] = run(client, args.requests)
+
+    enrollment.ENROLL_PAGE_CACHE = True
+    run(client, 50)
+    results["cached 200"] = run(client, args.requests)
+
+    # Both languages share the loop, so send both ETags like a browser with both pages cached.
+    etags = [client.get(f"/enroll?lang={lang}").headers["ETag"] for lang in ("en", "es")]
+    results["revalidated 304"] = run(client, args.requests, {"If-None-Match": ", ".join(etags)})
+
+    base = results["render every time"]
+    for name, rps in results.items():
+        print(f"{name:>18}: {rps:8.0f} req/s  ({rps / base:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Peak RSS and time-to-first-byte of /admin/export.csv at increasing table sizes.
+
+Each measurement runs in a fresh child process so ru_maxrss reflects only that
+export. ``--legacy`` also measures the old fetchall + StringIO implementation
+for comparison.
+
+    python bench/export_bench.py                       # 10k, 100k, 1M rows
+    python bench/export_bench.py --sizes 10000 100000 --legacy
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def build_db(path: str, rows: int) -> None:
+    os.environ["DB_PATH"] = path
+    import app as enrollment
+
+    enrollment.init_db()
+    rng = random.Random(rows)
+    conn = sqlite3.connect(path)
+    payload = {f"field_{i}": "x" * rng.randint(5, 30) for i in range(60)}
+    batch = []
+    for i in range(1, rows + 1):
+        payload["first_name"] = f"Student{i}"
+        batch.append((
+            f"MUR-2026-{i:05d}", "2026-01-20T08:00:00", "en", "kuban",
+            f"Student{i}", "Example", "2018-01-01", "Parent", "parent@example.org", "6025550100",
+            json.dumps(payload),
+        ))
+        if len(batch) == 10000:
+            conn.executemany(
+                "INSERT INTO submissions(submission_id, created_at, lang, school, student_first, student_last, dob,"
+                " parent_name, parent_email, parent_phone, payload_json) VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+                batch,
+            )
+            batch.clear()
+    if batch:
+        conn.executemany(
+            "INSERT INTO submissions(submission_id, created_at, lang, school, student_first, student_last, dob,"
+            " parent_name, parent_email, parent_phone, payload_json) VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+            batch,
+        )
+    conn.commit()
+    conn.close()
+
+
+def legacy_export(path: str) -> tuple:
+    """The pre-streaming implementation: fetchall, StringIO, encode, write to disk."""
+    import csv
+    from io import StringIO
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM submissions ORDER BY id DESC").fetchall()
+    conn.close()
+    out = StringIO()
+    writer = csv.writer(out)
+    for r in rows:
+        writer.writerow(list(r)[1:])
+    csv_bytes = out.getvalue().encode("utf-8")
+    tmp = path + ".export.csv"
+    with open(tmp, "wb") as f:
+        f.write(csv_bytes)
+    # send_file only starts sending once the whole file exists
+    ttfb = time.perf_counter() - start
+    total = len(csv_bytes)
+    os.remove(tmp)
+    return ttfb, time.perf_counter() - start, total
+
+
+def streaming_export(path: str) -> tuple:
+    os.environ["DB_PATH"] = path
+    os.environ["ADMIN_PASSWORD"] = "bench"
+    import app as enrollment
+
+    client = enrollment.app.test_client()
+    start = time.perf_counter()
+    resp = client.get("/admin/export.csv?pw=bench", buffered=False)
+    assert resp.status_code == 200, resp.status_code
+    ttfb = None
+    total = 0
+    for chunk in resp.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        total += len(chunk)
+    resp.close()
+    return ttfb, time.perf_counter() - start, total
+
+
+def child(path: str, mode: str) -> None:
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == "stream":
+        os.environ["DB_PATH"] = path
+        os.environ["ADMIN_PASSWORD"] = "bench"
+        import app  # noqa: F401  (import cost is not part of the export)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        ttfb, elapsed, size = streaming_export(path)
+    else:
+        ttfb, elapsed, size = legacy_export(path)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"ttfb": ttfb, "elapsed": elapsed, "bytes": size, "peak_kb": peak, "delta_kb": peak - baseline}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy", action="store_true", help="also measure the old fetchall implementation")
+    parser.add_argument("--build", nargs=2, metavar=("DB", "ROWS"), help=argparse.SUPPRESS)
+    parser.add_argument("--child", nargs=2, metavar=("DB", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build:
+        build_db(args.build[0], int(args.build[1]))
+        return
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp()
+    modes = ["stream"] + (["legacy"] if args.legacy else [])
+    print(f"{'rows':>9} {'mode':>7} {'ttfb_ms':>9} {'total_s':>8} {'MB_out':>8} {'peak_MB':>8} {'+RSS_MB':>8}")
+    for rows in args.sizes:
+        path = os.path.join(workdir, f"export_{rows}.db")
+        subprocess.run([sys.executable, __file__, "--build", path, str(rows)], check=True)
+        for mode in modes:
+            out = subprocess.run([sys.executable, __file__, "--child", path, mode], check=True, capture_output=True, text=True)
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{rows:>9} {mode:>7} {1000 * r['ttfb']:>9.1f} {r['elapsed']:>8.2f} {r['bytes'] / 1e6:>8.1f}"
+                  f" {r['peak_kb'] / 1024:>8.1f} {r['delta_kb'] / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Family linking at scale: batch rebuild time and per-insert link latency.
+
+For each size, bulk-loads synthetic submissions into a fresh database
+(synthetic.bulk_load: every row comes from one of --households templates that
+share surname, parent and address), then times rebuild_family_links and
+link_family for new submissions. A pairwise baseline (each new submission
+scored against every family) is timed on a sample for comparison.
+
+    python bench/family_bench.py                          # 10k, 50k, 100k rows
+    python bench/family_bench.py --rows 100000 --households 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def fresh_app(workdir: str):
+    os.environ["DB_PATH"] = os.path.join(workdir, "families.db")
+    os.environ["SMTP_HOST"] = ""
+    os.environ["OUTBOX_WORKER"] = "off"
+    os.environ.setdefault("DB_CACHE_SIZE", "-262144")
+    for name in ("app", "synthetic"):
+        sys.modules.pop(name, None)
+    import app as enrollment
+    import synthetic
+
+    enrollment.init_db()
+    return enrollment, synthetic
+
+
+def run(rows: int, args) -> dict:
+    enrollment, synthetic = fresh_app(tempfile.mkdtemp())
+    new = []
+    for lang, form in synthetic.submissions(args.inserts, seed=rows):
+        clean, errors = enrollment.validate_form(form)
+        assert not errors, errors
+        new.append(clean)
+
+    with enrollment.POOL.connection() as conn:
+        synthetic.bulk_load(conn, rows, seed=1, search=False, families=args.households)
+        start = time.perf_counter()
+        count, families = enrollment.run_write(conn, enrollment.rebuild_family_links)
+        rebuild = time.perf_counter() - start
+
+        # Incremental: link_family for each new payload in one transaction, rolled back afterwards.
+        next_row = conn.execute("SELECT MAX(id) FROM submissions").fetchone()[0] + 1
+        conn.execute("BEGIN IMMEDIATE")
+        latencies = []
+        for k, clean in enumerate(new):
+            start = time.perf_counter()
+            enrollment.link_family(conn, next_row + k, clean)
+            latencies.append(time.perf_counter() - start)
+        conn.rollback()
+
+        # Pairwise baseline: score a sample against every family's key set.
+        family_keys = {}
+        for key, family in conn.execute("SELECT key, family_id FROM family_keys"):
+            family_keys.setdefault(family, set()).add(key)
+        sample = new[: args.pairwise_sample]
+        start = time.perf_counter()
+        for clean in sample:
+            contact, supporting = enrollment._family_probes(enrollment.family_keys(clean))
+            probes = contact | supporting
+            enrollment._linked_families({f: probes & keys for f, keys in family_keys.items() if probes & keys})
+        pairwise = (time.perf_counter() - start) / max(len(sample), 1)
+
+    latencies.sort()
+    return {
+        "rows": count,
+        "families": families,
+        "rebuild_s": rebuild,
+        "rebuild_rows_s": count / rebuild,
+        "link_mean_us": 1e6 * sum(latencies) / len(latencies),
+        "link_p99_us": 1e6 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "pairwise_us": 1e6 * pairwise,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--households", type=int, default=1000, help="family templates in the bulk load")
+    parser.add_argument("--inserts", type=int, default=1000, help="new submissions linked incrementally")
+    parser.add_argument("--pairwise-sample", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"households={args.households} inserts={args.inserts} ({datetime.now():%Y-%m-%d %H:%M})")
+    print(f"{'rows':>8} {'families':>8} {'rebuild_s':>9} {'rows/s':>8} {'link_us':>8} {'p99_us':>8} {'pairwise_us':>11}")
+    for n in args.rows:
+        r = run(n, args)
+        print(f"{r['rows']:>8} {r['families']:>8} {r['rebuild_s']:>9.2f} {r['rebuild_rows_s']:>8.0f}"
+              f" {r['link_mean_us']:>8.0f} {r['link_p99_us']:>8.0f} {r['pairwise_us']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
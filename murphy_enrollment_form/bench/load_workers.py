@@ -0,0 +1,139 @@
+"""Throughput of the gunicorn deployment as the worker count grows.
+
+For each worker count, starts ``gunicorn -c gunicorn.conf.py`` on a fresh
+database and drives it over HTTP with keep-alive client processes: a mix of
+GET /enroll (cached page) and POST /enroll (full submission write).
+
+    python bench/load_workers.py --workers 1 2 4 --seconds 10
+    python bench/load_workers.py --post-ratio 1.0      # writes only
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from stress_ids import FORM  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/enroll")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def client(port: int, seconds: float, post_ratio: float, seed: int, out) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    done = errors = 0
+    latencies = []
+    step = 0.0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        step += post_ratio
+        start = time.perf_counter()
+        try:
+            if step >= 1.0:
+                step -= 1.0
+                # A distinct student per POST; identical ones would be answered as resubmissions.
+                body = urlencode(dict(FORM, first_name=f"Load {seed}-{done + errors}"))
+                conn.request("POST", "/enroll?lang=en", body=body, headers=headers)
+                expect = 302
+            else:
+                conn.request("GET", f"/enroll?lang={'en' if seed % 2 else 'es'}")
+                expect = 200
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == expect
+            if ok:
+                done += 1
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    out.put((done, errors, latencies))
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    workdir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DB_PATH=os.path.join(workdir, "load.db"),
+        WEB_WORKERS=str(workers),
+        WEB_THREADS=str(args.threads),
+        BIND=f"127.0.0.1:{port}",
+        SMTP_HOST="",
+        OUTBOX_WORKER="off",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=client, args=(port, args.seconds, args.post_ratio, i, out)) for i in range(args.clients)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait()
+    done = sum(r[0] for r in results)
+    latencies = sorted(x for r in results for x in r[2])
+
+    def pct(q):
+        return 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+    return {"rps": done / args.seconds, "errors": sum(r[1] for r in results), "p50": pct(0.50), "p99": pct(0.99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="WEB_THREADS per gunicorn worker")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent keep-alive client processes")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--post-ratio", type=float, default=0.2, help="fraction of requests that are POST /enroll")
+    args = parser.parse_args()
+
+    print(f"clients={args.clients} threads/worker={args.threads} post_ratio={args.post_ratio} {args.seconds:.0f}s each")
+    print(f"{'workers':>7} {'req/s':>8} {'scale':>6} {'p50_ms':>7} {'p99_ms':>7} {'errors':>6}")
+    base = None
+    for n in args.workers:
+        r = run(n, args)
+        base = base or r["rps"]
+        print(f"{n:>7} {r['rps']:>8.0f} {r['rps'] / base:>5.1f}x {r['p50']:>7.1f} {r['p99']:>7.1f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Encode time and stored bytes per row for payload_json on a 20-sibling form.
+
+Compares the old path (per-key json.dumps probe, then json.dumps of the
+whole dict) with encode_payload() on the validated payload.
+
+    python bench/payload_bench.py --rounds 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def sample_form(siblings: int = 20) -> dict:
+    form = {
+        "lang": "es",
+        "school": "sullivan",
+        "first_name": "María José",
+        "middle_name": "Guadalupe",
+        "last_name": "Hernández",
+        "dob": "2017-09-14",
+        "sex": "female",
+        "grade": "3",
+        "birth_state": "Sonora",
+        "birth_country": "México",
+        "address1": "4521 W Encanto Blvd",
+        "apt": "12B",
+        "city": "Phoenix",
+        "state": "AZ",
+        "zip": "85035",
+        "az_school": "yes",
+        "az_school_details": "Kindergarten at Tuscano Elementary",
+        "murphy_before": "no",
+        "preschool": "yes",
+        "preschool_details": "Head Start, 2021-2022",
+        "last_school": "Tuscano Elementary",
+        "last_school_city_state": "Phoenix, AZ",
+        "ethnicity": "yes",
+        "tribal_affiliation": "no",
+        "transport": "bus",
+        "has_murphy_siblings": "yes",
+        "sibling_count": str(siblings),
+        "custody_type": "Madre",
+        "temp_address": "no",
+        "entry_us": "2019-03-02",
+        "sped": "1",
+        "migrant": "1",
+        "home_language": "Español",
+        "expelled": "no",
+        "suspended10": "no",
+        "considered": "no",
+        "parent_name": "Rosa Hernández",
+        "parent_cell": "(602) 555-0147",
+        "parent_email": "rosa.hernandez@example.org",
+        "typed_signature": "Rosa Hernández",
+        "agree": "1",
+        "email_skip_confirmed": "",
+    }
+    for i in range(1, siblings + 1):
+        form[f"sibling{i}_name"] = f"Hermano Hernández {i}"
+        form[f"sibling{i}_grade"] = str(i % 9)
+        form[f"sibling{i}_school"] = "Kuban Elementary School" if i % 2 else "Sullivan Elementary School"
+        form[f"sibling{i}_lives"] = "yes"
+    return form
+
+
+def legacy_encode(form: dict, race: list) -> str:
+    payload = dict(form)
+    payload["race"] = race
+    for key in list(payload.keys()):
+        try:
+            json.dumps(payload[key])
+        except (TypeError, ValueError):
+            del payload[key]
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--siblings", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import app as enrollment
+
+    form = sample_form(args.siblings)
+    race = ["white", "american_indian_alaska"]
+    clean, errors = enrollment.validate_form({**form, "race": race})
+    assert not errors, errors
+
+    legacy = legacy_encode(form, race)
+    current = enrollment.encode_payload(clean)
+    old = json.loads(legacy)
+    assert all(old.get(k, "") == v for k, v in json.loads(current).items())
+
+    t_legacy = timeit.timeit(lambda: legacy_encode(form, race), number=args.rounds) / args.rounds
+    t_current = timeit.timeit(lambda: enrollment.encode_payload(clean), number=args.rounds) / args.rounds
+
+    print(f"{args.siblings}-sibling payload, {len(clean)} fields, {args.rounds} rounds")
+    print(f"  legacy probe + dumps : {1e6 * t_legacy:7.1f} us/row  {len(legacy.encode()):6d} bytes/row")
+    print(f"  encode_payload       : {1e6 * t_current:7.1f} us/row  {len(current.encode()):6d} bytes/row")
+    print(f"  speedup {t_legacy / t_current:.1f}x, {100 * (1 - len(current.encode()) / len(legacy.encode())):.0f}% fewer bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Latency percentiles and throughput for the main enrollment-day endpoints.
+
+Scenarios: GET /enroll, POST /enroll, GET /success/<id>, GET /admin,
+GET /admin/dashboard and GET /admin/export.csv. By default the app runs in-process (Flask test
+client, fresh database seeded with synthetic submissions from synthetic.py);
+``--url`` drives a running server over HTTP instead (POSTs seed it).
+
+Each run is saved to bench/results/<timestamp>-<commit>.json and compared
+with the previous saved run, so a change can be judged against the commit
+before it.
+
+    python bench/run_bench.py                           # all scenarios, in-process
+    python bench/run_bench.py --only enroll_post success --concurrency 8
+    python bench/run_bench.py --url http://127.0.0.1:8000 --admin-pw secret
+    python bench/run_bench.py --compare bench/results/<file>.json
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from synthetic import submission, submissions  # noqa: E402
+
+SCENARIOS = ("enroll_get", "enroll_post", "success", "admin", "dashboard", "export")
+
+
+class TestClientTransport:
+    """In-process requests through Flask's test client (one client per thread)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method: str, path: str, form=None) -> tuple:
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        resp = client.open(path, method=method, data=form)
+        size = len(resp.get_data())
+        resp.close()
+        return resp.status_code, size
+
+
+class HttpTransport:
+    """Keep-alive HTTP/1.1 requests against a running server (one connection per thread)."""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.local = threading.local()
+
+    def request(self, method: str, path: str, form=None) -> tuple:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        body, headers = None, {}
+        if form is not None:
+            body = urlencode(form, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            size = len(resp.read())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+        return resp.status, size
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(transport, make_request, requests: int, concurrency: int, warmup: int) -> dict:
+    """Fire ``requests`` requests from ``concurrency`` threads; ``make_request(i)`` -> (method, path, form, ok_status)."""
+    for i in range(warmup):
+        method, path, form, _ = make_request(-1 - i)
+        transport.request(method, path, form)
+
+    latencies, errors, sizes = [], [0], [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker() -> None:
+        local, local_errors, local_bytes = [], 0, 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, form, ok_status = make_request(i)
+            start = time.perf_counter()
+            try:
+                status, size = transport.request(method, path, form)
+            except (OSError, http.client.HTTPException):
+                status, size = 0, 0
+            elapsed = time.perf_counter() - start
+            if status == ok_status:
+                local.append(elapsed)
+                local_bytes += size
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+            sizes[0] += local_bytes
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors[0],
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+        "bytes_per_response": round(sizes[0] / len(latencies)) if latencies else 0,
+    }
+
+
+def seed_database(enrollment, rows: int) -> list:
+    """Insert ``rows`` synthetic submissions directly; returns their submission IDs."""
+    now = datetime.now()
+    ids = []
+    pending = list(submissions(rows, seed=rows))
+    with enrollment.POOL.connection() as conn:
+        for start in range(0, len(pending), 1000):
+            items = []
+            for lang, form in pending[start:start + 1000]:
+                clean, errors = enrollment.validate_form(form)
+                assert not errors, errors
+                items.append((lang, clean, None))
+            outcomes = enrollment.run_write(conn, enrollment._insert_batch, now, items)
+            ids.extend(submission_id for submission_id, created in outcomes if created)
+        # Seeding queues notification emails; they are not what is being measured.
+        conn.execute("DELETE FROM outbox")
+        conn.commit()
+    return ids
+
+
+def git_revision() -> tuple:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=ROOT, capture_output=True, text=True)
+        return rev.stdout.strip(), bool(dirty.stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def previous_result(exclude: str):
+    files = sorted(f for f in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if f != exclude)
+    return files[-1] if files else None
+
+
+def print_table(results: dict, baseline) -> None:
+    base = (baseline or {}).get("results", {})
+    print(f"{'scenario':>12} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'errors':>6} {'p95 vs base':>12}")
+    for name, r in results.items():
+        delta = ""
+        if name in base and base[name]["p95_ms"]:
+            delta = f"{100 * (r['p95_ms'] / base[name]['p95_ms'] - 1):+.0f}%"
+        print(f"{name:>12} {r['rps']:>8.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+              f" {r['errors']:>6} {delta:>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario (export uses --export-requests)")
+    parser.add_argument("--export-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed-rows", type=int, default=10000, help="synthetic submissions inserted before measuring")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--admin-pw", default="bench", help="ADMIN_PASSWORD of the server under test")
+    parser.add_argument("--compare", help="results file to compare with (default: the previous run)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    if args.url:
+        transport = HttpTransport(args.url)
+        ids = []
+    else:
+        os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["ADMIN_PASSWORD"] = args.admin_pw
+        os.environ["SMTP_HOST"] = ""
+        os.environ["OUTBOX_WORKER"] = "off"
+        import app as enrollment
+
+        enrollment.init_app()
+        start = time.perf_counter()
+        ids = seed_database(enrollment, args.seed_rows)
+        print(f"seeded {len(ids)} submissions in {time.perf_counter() - start:.1f}s")
+        transport = TestClientTransport(enrollment.app)
+
+    rng = random.Random(1)
+    pw = urlencode({"pw": args.admin_pw})
+    post_rng = random.Random(2)
+    post_lock = threading.Lock()
+
+    def enroll_post(i):
+        with post_lock:
+            lang, form = submission(post_rng, 100_000 + i)
+        return "POST", f"/enroll?lang={lang}", form, 302
+
+    if args.url and "success" in args.only:
+        # Collect IDs by submitting through the server under test.
+        for i in range(50):
+            method, path, form, _ = enroll_post(-10_000 - i)
+            conn = http.client.HTTPConnection(transport.host, transport.port, timeout=60)
+            conn.request(method, path, body=urlencode(form, doseq=True),
+                         headers={"Content-Type": "application/x-www-form-urlencoded"})
+            location = conn.getresponse().getheader("Location", "")
+            conn.close()
+            if "/success/" in location:
+                ids.append(location.split("/success/")[1].split("?")[0])
+
+    scenarios = {
+        "enroll_get": lambda i: ("GET", f"/enroll?lang={'es' if i % 5 < 3 else 'en'}", None, 200),
+        "enroll_post": enroll_post,
+        "success": lambda i: ("GET", f"/success/{rng.choice(ids)}?lang={'es' if i % 2 else 'en'}", None, 200),
+        "admin": lambda i: ("GET", f"/admin?{pw}", None, 200),
+        "dashboard": lambda i: ("GET", f"/admin/dashboard?{pw}", None, 200),
+        "export": lambda i: ("GET", f"/admin/export.csv?{pw}", None, 200),
+    }
+
+    results = {}
+    for name in args.only:
+        if name == "success" and not ids:
+            print("success: no submission IDs to request, skipped")
+            continue
+        n = args.export_requests if name == "export" else args.requests
+        warmup = min(args.warmup, 1) if name == "export" else args.warmup
+        results[name] = measure(transport, scenarios[name], n, args.concurrency, warmup)
+
+    rev, dirty = git_revision()
+    record = {
+        "commit": rev + ("-dirty" if dirty else ""),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "target": args.url or "in-process",
+        "settings": {k: getattr(args, k) for k in ("requests", "export_requests", "concurrency", "seed_rows")},
+        "results": results,
+    }
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{record['commit']}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+
+    baseline_path = args.compare or previous_result(path)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"baseline: {os.path.basename(baseline_path)} ({baseline['commit']})")
+    print_table(results, baseline)
+    if path:
+        print(f"saved {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
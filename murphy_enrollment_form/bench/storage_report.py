@@ -0,0 +1,95 @@
+"""Database size for 100k synthetic submissions under each PAYLOAD_STORAGE mode.
+
+Builds the rows once as full JSON, then copies the database and migrates the
+copy with recode_payloads() (the code behind ``flask compact-payloads``),
+VACUUMing each file before measuring.
+
+    python bench/storage_report.py --rows 100000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from synthetic import submissions  # noqa: E402
+
+
+def build(enrollment, rows: int) -> None:
+    with enrollment.POOL.connection() as conn:
+        batch = []
+        for i, (lang, form) in enumerate(submissions(rows, seed=rows), 1):
+            clean, errors = enrollment.validate_form(form)
+            assert not errors, errors
+            cols = enrollment.submission_columns(clean)
+            batch.append((
+                f"MUR-2026-{i:06d}", "2026-01-20T08:00:00", lang, cols["school"], cols["student_first"],
+                cols["student_last"], cols["dob"], cols["parent_name"], cols["parent_email"], cols["parent_phone"],
+                enrollment.encode_payload(clean, conn, "json"),
+            ))
+            if len(batch) == 10000 or i == rows:
+                conn.executemany(
+                    "INSERT INTO submissions(submission_id, created_at, lang, school, student_first, student_last,"
+                    " dob, parent_name, parent_email, parent_phone, payload_json) VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+                    batch,
+                )
+                batch.clear()
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def measure(path: str) -> tuple:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    payload_bytes = conn.execute("SELECT SUM(length(CAST(payload_json AS BLOB))) FROM submissions").fetchone()[0]
+    conn.close()
+    return os.path.getsize(path), payload_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    base = os.path.join(workdir, "json.db")
+    os.environ["DB_PATH"] = base
+    import app as enrollment
+
+    enrollment.init_db()
+    start = time.perf_counter()
+    build(enrollment, args.rows)
+    print(f"built {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    results = {"json": measure(base)}
+    for mode in ("compact", "zlib"):
+        path = os.path.join(workdir, f"{mode}.db")
+        shutil.copyfile(base, path)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        start = time.perf_counter()
+        if mode == "zlib":
+            enrollment.run_write(conn, enrollment.train_payload_dict)
+        enrollment.recode_payloads(conn, mode)
+        elapsed = time.perf_counter() - start
+        conn.execute("VACUUM")
+        conn.close()
+        results[mode] = measure(path)
+        print(f"migrated to {mode} in {elapsed:.1f}s")
+
+    db_json, payload_json = results["json"]
+    print(f"{'mode':>8} {'db_MB':>8} {'payload_MB':>11} {'B/row':>7} {'vs json':>8}")
+    for mode, (db_bytes, payload_bytes) in results.items():
+        print(f"{mode:>8} {db_bytes / 1e6:>8.1f} {payload_bytes / 1e6:>11.1f} {payload_bytes / args.rows:>7.0f}"
+              f" {100 * db_bytes / db_json:>7.0f}%")
+
+
+if __name__ == "__main__":
+    main()
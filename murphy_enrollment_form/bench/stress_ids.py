@@ -0,0 +1,103 @@
+"""Stress the submission ID allocator with N worker processes x M concurrent POSTs.
+
+Each worker process imports the app on its own (like a gunicorn worker) and
+fires M threads at POST /enroll through the Flask test client. Afterwards the
+script checks that every submission got a distinct MUR-YYYY-NNNNN ID.
+
+    python bench/stress_ids.py --workers 4 --threads 8 --posts 50
+    python bench/stress_ids.py --block 20   # per-process ID blocks
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+FORM = {
+    "school": "kuban",
+    "first_name": "Stress",
+    "last_name": "Test",
+    "dob": "2018-05-01",
+    "sex": "female",
+    "address1": "100 Main St",
+    "city": "Phoenix",
+    "state": "AZ",
+    "zip": "85009",
+    "parent_name": "Parent",
+    "parent_cell": "6025550100",
+    "parent_email": "parent@example.org",
+    "typed_signature": "Parent",
+    "agree": "1",
+}
+
+
+def worker(threads: int, posts: int, errors) -> None:
+    import app as enrollment
+
+    enrollment.init_db()
+    client = enrollment.app.test_client()
+
+    def run() -> None:
+        for n in range(posts):
+            # A distinct student per POST; identical ones would be answered as resubmissions.
+            form = dict(FORM, first_name=f"Stress {os.getpid()}-{threading.get_ident()}-{n}")
+            resp = client.post("/enroll?lang=en", data=form)
+            if resp.status_code != 302:
+                errors.put(resp.status_code)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=25, help="POSTs per thread")
+    parser.add_argument("--block", type=int, default=1, help="SUBMISSION_ID_BLOCK for the workers")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ["DB_PATH"] = db_path
+    os.environ["SUBMISSION_ID_BLOCK"] = str(args.block)
+    os.environ["SMTP_HOST"] = ""
+
+    ctx = multiprocessing.get_context("spawn")
+    errors = ctx.Queue()
+    start = time.perf_counter()
+    procs = [ctx.Process(target=worker, args=(args.threads, args.posts, errors)) for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    while not errors.empty():
+        errors.get()
+        failed += 1
+
+    conn = sqlite3.connect(db_path)
+    total, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT submission_id) FROM submissions").fetchone()
+    conn.close()
+
+    expected = args.workers * args.threads * args.posts
+    print(f"workers={args.workers} threads={args.threads} posts/thread={args.posts} block={args.block}")
+    print(f"expected={expected} stored={total} distinct_ids={distinct} failed_posts={failed}")
+    print(f"elapsed={elapsed:.2f}s ({expected / elapsed:.0f} POST/s)")
+    ok = total == expected and distinct == total and failed == 0
+    print("OK: no duplicate IDs" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
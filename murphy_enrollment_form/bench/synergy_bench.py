@@ -0,0 +1,66 @@
+"""Synergy export throughput by number of transform processes.
+
+Bulk-loads synthetic submissions into a fresh database (synthetic.bulk_load),
+then writes the Synergy import CSV (iter_synergy_csv) once per worker count
+and reports rows/sec. Every run's output is checked against the one-worker
+(in-thread) run, so a parallel speed-up never comes at the cost of order or
+content.
+
+    python bench/synergy_bench.py                          # 100k rows, 1/2/4 workers
+    python bench/synergy_bench.py --rows 500000 --workers 1 4 8 --chunk-rows 5000
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-rows", type=int, default=None, help="SYNERGY_CHUNK_ROWS (default: the app's)")
+    args = parser.parse_args()
+
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "synergy.db")
+    os.environ["SMTP_HOST"] = ""
+    os.environ["OUTBOX_WORKER"] = "off"
+    os.environ.setdefault("DB_CACHE_SIZE", "-262144")
+    if args.chunk_rows:
+        os.environ["SYNERGY_CHUNK_ROWS"] = str(args.chunk_rows)
+    import app as enrollment
+    import synthetic
+
+    enrollment.init_db()
+    with enrollment.POOL.connection() as conn:
+        synthetic.bulk_load(conn, args.rows, seed=1, search=False)
+
+    print(f"rows={args.rows} chunk_rows={enrollment.SYNERGY_CHUNK_ROWS} cpus={os.cpu_count()}"
+          f" ({datetime.now():%Y-%m-%d %H:%M})")
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>9} {'MB':>7} {'speed-up':>8} {'same':>5}")
+    baseline = None
+    for workers in args.workers:
+        pool = enrollment.ExportWorkers(workers)
+        digest, size = hashlib.sha256(), 0
+        with enrollment.POOL.connection() as conn:
+            cur = conn.execute(f"SELECT {', '.join(enrollment.SYNERGY_SOURCE_COLUMNS)} FROM submissions ORDER BY id")
+            start = time.perf_counter()
+            for chunk in enrollment.iter_synergy_csv(cur, conn, pool):
+                digest.update(chunk)
+                size += len(chunk)
+            elapsed = time.perf_counter() - start
+        pool.shutdown()
+        if baseline is None:
+            baseline = (elapsed, digest.hexdigest())
+        print(f"{pool.workers:>7} {elapsed:>8.2f} {args.rows / elapsed:>9.0f} {size / 1e6:>7.1f}"
+              f" {baseline[0] / elapsed:>7.2f}x {str(digest.hexdigest() == baseline[1]):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""gunicorn settings, tuned through environment variables (see README)."""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+wsgi_app = "wsgi:application"
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+# Import the app and run init_db once in the master; workers fork from it.
+preload_app = True
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+
+# All workers sit behind one port, so a Prometheus scrape reaches whichever worker
+# accepts it. Each worker writes its metrics to a file in METRICS_DIR and /metrics
+# merges them all. This must be set before the app is imported.
+if os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes"):
+    os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="enroll-metrics-"))
+
+
+def on_starting(server):
+    # Files left by an earlier run in a reused METRICS_DIR would be summed into this one.
+    if os.getenv("METRICS_DIR"):
+        for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*.json")):
+            os.remove(path)
+
+
+def post_worker_init(worker):
+    # Each worker drains the outbox in its own thread (claims are leased, so
+    # several workers never send the same message).
+    import app
+
+    if app.OUTBOX_WORKER == "thread":
+        app.OUTBOX.ensure_started()
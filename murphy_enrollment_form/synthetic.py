@@ -0,0 +1,240 @@
+"""Realistic synthetic enrollment submissions for benchmarks and capacity tests.
+
+``submission(rng, i)`` returns ``(lang, form)`` where ``form`` is what the
+browser would POST to /enroll: about 60% Spanish-language forms, Hispanic and
+Anglo names, 0-4 Murphy siblings, one or two races, occasional transport
+"other" and service flags. Every form passes ``validate_form``.
+
+    from synthetic import submissions
+    for lang, form in submissions(1000, seed=7): ...
+
+``bulk_load`` (``flask --app app load-synthetic``) writes large volumes of
+them straight into the database, derived tables and counters included.
+"""
+import random
+from datetime import datetime, timedelta
+
+FIRST = [
+    "Ana", "Luis", "María José", "José Ángel", "Sofía", "Mateo", "Ximena", "Santiago", "Valentina", "Diego",
+    "Emma", "Noah", "Olivia", "Liam", "Ava", "Elijah", "Mia", "James", "Harper", "Lucas",
+]
+MIDDLE = ["", "", "", "Guadalupe", "Alejandro", "Marie", "Lee", "Isabel", "Antonio"]
+LAST = [
+    "Hernández", "García", "Martínez", "López", "González", "Rodríguez", "Pérez", "Sánchez", "Ramírez", "Flores",
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Nguyen", "Begay", "Yazzie", "Tso", "Davis",
+]
+PARENT_FIRST = ["Rosa", "Juan", "Guadalupe", "Carlos", "Maribel", "Jennifer", "Michael", "Ashley", "David", "Lorena"]
+STREETS = ["W Encanto Blvd", "N 35th Ave", "W Thomas Rd", "N 43rd Ave", "W McDowell Rd", "W Osborn Rd", "N 51st Ave"]
+RACES = ["white", "african_american", "asian", "american_indian_alaska", "hawaiian_pacific_islander"]
+RACE_WEIGHTS = [60, 8, 3, 7, 2]
+CUSTODY = {"en": ["Shared", "Mother", "Father", "Other"], "es": ["Compartida", "Madre", "Padre", "Otro"]}
+HOME_LANGUAGE = {"en": ["English", "English", "Spanish", "Navajo"], "es": ["Español", "Español", "Inglés"]}
+FLAGS = ["sped", "plan504", "gifted", "refugee", "migrant", "immigrant"]
+
+
+def _yes_no(rng: random.Random, p_yes: float) -> str:
+    return "yes" if rng.random() < p_yes else "no"
+
+
+def submission(rng: random.Random, i: int) -> tuple:
+    lang = "es" if rng.random() < 0.6 else "en"
+    last = rng.choice(LAST)
+    first = rng.choice(FIRST)
+    parent = f"{rng.choice(PARENT_FIRST)} {last}"
+    year = rng.randint(2011, 2021)
+    form = {
+        "school": rng.choice(["kuban", "sullivan"]),
+        "first_name": first,
+        "middle_name": rng.choice(MIDDLE),
+        "last_name": last,
+        "dob": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "sex": rng.choice(["male", "female"]),
+        "grade": "K" if year >= 2020 else str(min(8, 2025 - year - 5)),
+        "birth_state": rng.choice(["Arizona", "Arizona", "Sonora", "California", "Chihuahua"]),
+        "birth_country": "México" if lang == "es" and rng.random() < 0.3 else "USA",
+        "address1": f"{rng.randint(1000, 9999)} {rng.choice(STREETS)}",
+        "apt": rng.choice(["", "", "", f"{rng.randint(1, 40)}{rng.choice('AB')}"]),
+        "city": "Phoenix",
+        "state": "AZ",
+        "zip": rng.choice(["85009", "85031", "85033", "85035", "85037"]),
+        "az_school": _yes_no(rng, 0.6),
+        "murphy_before": _yes_no(rng, 0.3),
+        "preschool": _yes_no(rng, 0.4),
+        "last_school": rng.choice(["", "Tuscano Elementary", "Pendergast Elementary", "Head Start"]),
+        "ethnicity": _yes_no(rng, 0.7 if lang == "es" else 0.3),
+        "tribal_affiliation": _yes_no(rng, 0.05),
+        "race": rng.choices(RACES, RACE_WEIGHTS, k=rng.choice([1, 1, 1, 2])),
+        "transport": rng.choice(["bus", "bus", "car", "walk", "carpool", "other"]),
+        "custody_type": rng.choice(CUSTODY[lang]),
+        "temp_address": _yes_no(rng, 0.05),
+        "home_language": rng.choice(HOME_LANGUAGE[lang]),
+        "expelled": "no",
+        "suspended10": "no",
+        "considered": "no",
+        "parent_name": parent,
+        "parent_cell": f"(602) {200 + i // 10000 % 800:03d}-{i % 10000:04d}",
+        "parent_email": "" if rng.random() < 0.15 else f"{parent.split()[0].lower()}{i}@example.org",
+        "typed_signature": parent,
+        "agree": "1",
+    }
+    form["race"] = sorted(set(form["race"]))
+    if not form["parent_email"]:
+        # What the browser sends after the parent confirms "continue without email".
+        form["email_skip_confirmed"] = "1"
+    if form["az_school"] == "yes":
+        form["az_school_details"] = "Kindergarten at Tuscano Elementary"
+    if form["murphy_before"] == "yes":
+        form["murphy_before_details"] = "Kuban Elementary, 2022"
+    if form["preschool"] == "yes":
+        form["preschool_details"] = "Head Start"
+    if form["transport"] == "other":
+        form["transport_other"] = "Grandparent drops off" if lang == "en" else "La abuela lo lleva"
+    if lang == "es" and rng.random() < 0.4:
+        form["entry_us"] = f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02d}-01"
+    for flag in FLAGS:
+        if rng.random() < 0.08:
+            form[flag] = "1"
+    siblings = rng.choices([0, 1, 2, 3, 4], [50, 25, 15, 7, 3])[0]
+    form["has_murphy_siblings"] = "yes" if siblings else "no"
+    if siblings:
+        form["sibling_count"] = str(siblings)
+        for n in range(1, siblings + 1):
+            form[f"sibling{n}_name"] = f"{rng.choice(FIRST)} {last}"
+            form[f"sibling{n}_grade"] = str(rng.randint(0, 8))
+            form[f"sibling{n}_school"] = rng.choice(["Kuban Elementary School", "Sullivan Elementary School"])
+            form[f"sibling{n}_lives"] = _yes_no(rng, 0.9)
+    return lang, form
+
+
+def submissions(n: int, seed: int = 0):
+    """Yield ``n`` reproducible ``(lang, form)`` pairs."""
+    rng = random.Random(seed)
+    for i in range(1, n + 1):
+        yield submission(rng, i)
+
+
+# Fields that change on every bulk-loaded row; the rest (parent contact details
+# included) comes from a family template.
+_VARYING = ("first_name", "dob", "submission_id")
+_MARK = "\ufdd0"
+_MONTH_DAYS = [f"{m:02d}-{d:02d}" for m in range(1, 13) for d in range(1, 29)]
+
+
+def _template(text: str) -> str:
+    """%-format string for ``text`` with every marked field turned into ``%(field)s``."""
+    text = text.replace("%", "%%")
+    for name in _VARYING:
+        text = text.replace(f"{_MARK}{name}{_MARK}", f"%({name})s")
+    return text
+
+
+class _Family:
+    """One generated, validated submission pre-rendered into every stored form.
+
+    The payload JSON and search document are kept as %-format strings with
+    slots for the per-row fields, so a bulk-loaded row costs a few string
+    formats instead of a validate/normalize/encode round.
+    """
+
+    def __init__(self, enrollment, conn, lang: str, form: dict, mode: str):
+        clean, errors = enrollment.validate_form(form)
+        if errors:
+            raise ValueError(f"synthetic form failed validation: {errors}")
+        marked = {k: f"{_MARK}{k}{_MARK}" if k in _VARYING and v else v for k, v in clean.items()}
+        cols = enrollment.submission_columns(clean)
+        typed, self.siblings, self.races = enrollment.normalize_payload(clean)
+        self.typed_names = tuple(typed)
+        self.typed = tuple(typed.values())
+        self.lang = lang
+        self.school = cols["school"]
+        self.last = cols["student_last"]
+        self.last_folded = enrollment.fold_name(self.last)
+        self.parent_name = cols["parent_name"]
+        self.parent_email = clean.get("parent_email", "")
+        self.parent_cell = cols["parent_phone"]
+        self.birth_year = clean["dob"][:4]
+        self.zlib = mode == "zlib"
+        self.payload = _template(enrollment.encode_payload(marked, conn, "compact" if self.zlib else mode))
+        doc = enrollment.search_document({**marked, "submission_id": f"{_MARK}submission_id{_MARK}"})
+        self.doc = tuple(_template(col) for col in doc)
+
+
+def bulk_load(conn, rows: int, year: int = 0, seed: int = 0, batch: int = 20000, search: bool = True,
+              families: int = 1000, start: datetime = None, days: int = 30, progress=None) -> int:
+    """Insert ``rows`` synthetic submissions with batched executemany, one transaction per ``batch``.
+
+    IDs come from the counters table (one reservation per batch), so they
+    stay consistent with submissions made through the app. Typed columns and
+    sibling/race rows are written alongside, and the search index too unless
+    ``search`` is False (then run rebuild_search_index afterwards); the
+    dashboard counts are recounted at the end. No emails are queued. ``progress(done)`` is called after each committed batch.
+    """
+    import app as enrollment
+
+    rng = random.Random(seed)
+    rand = rng.random
+    year = year or datetime.now().year
+    start = start or datetime(year, 1, 2, 7, 0)
+    step = timedelta(days=days) / max(rows, 1)
+    mode = enrollment.PAYLOAD_STORAGE
+    pool = [_Family(enrollment, conn, *submission(rng, i), mode) for i in range(1, families + 1)]
+    # Names go into JSON as-is, so they must not need escaping.
+    assert all(enrollment.PAYLOAD_ENCODER.encode(name) == f'"{name}"' for name in FIRST)
+    typed_names = pool[0].typed_names
+    identity_key = enrollment.identity_key
+    fold_name = enrollment.fold_name
+    insert_submission = (
+        "INSERT INTO submissions(id, submission_id, created_at, lang, school, student_first, student_last, dob,"
+        f" parent_name, parent_email, parent_phone, payload_json, identity_key, last_folded, first_folded,"
+        f" {', '.join(typed_names)}) VALUES({', '.join('?' * (15 + len(typed_names)))})"
+    )
+    insert_fts = (
+        f"INSERT INTO submissions_fts(rowid, {', '.join(enrollment.SEARCH_FIELDS)})"
+        f" VALUES(?{', ?' * len(enrollment.SEARCH_FIELDS)})"
+    )
+
+    def load(conn, offset: int, n: int) -> None:
+        first_seq = enrollment.ID_ALLOCATOR.reserve(conn, year, n) - n + 1
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM submissions").fetchone()[0]
+        subs, sibs, races, docs = [], [], [], []
+        for k in range(n):
+            fam = pool[int(rand() * len(pool))]
+            rowid = first_id + k
+            i = offset + k + 1
+            values = {
+                "submission_id": enrollment.format_submission_id(year, first_seq + k),
+                "first_name": FIRST[int(rand() * len(FIRST))],
+                "dob": f"{fam.birth_year}-{_MONTH_DAYS[int(rand() * len(_MONTH_DAYS))]}",
+            }
+            payload = fam.payload % values
+            if fam.zlib:
+                payload = enrollment.compress_payload(payload, conn)
+            subs.append((rowid, values["submission_id"], (start + step * i).isoformat(timespec="seconds"), fam.lang,
+                         fam.school, values["first_name"], fam.last, values["dob"], fam.parent_name,
+                         fam.parent_email, fam.parent_cell, payload,
+                         identity_key(fam.school, fam.last, values["first_name"], values["dob"]),
+                         fam.last_folded, fold_name(values["first_name"])) + fam.typed)
+            if fam.siblings:
+                sibs.extend([(rowid,) + sib for sib in fam.siblings])
+            races.extend([(rowid, race) for race in fam.races])
+            if search:
+                docs.append((rowid,) + tuple([col % values for col in fam.doc]))
+        conn.executemany(insert_submission, subs)
+        conn.executemany(
+            "INSERT INTO submission_siblings(submission_row, position, name, grade, school, lives_with)"
+            " VALUES(?,?,?,?,?,?)",
+            sibs,
+        )
+        conn.executemany("INSERT INTO submission_races(submission_row, race) VALUES(?,?)", races)
+        if docs:
+            conn.executemany(insert_fts, docs)
+
+    done = 0
+    while done < rows:
+        n = min(batch, rows - done)
+        enrollment.run_write(conn, load, done, n)
+        done += n
+        if progress is not None:
+            progress(done)
+    enrollment.run_write(conn, enrollment.rebuild_enrollment_counts)
+    return done
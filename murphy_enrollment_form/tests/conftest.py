@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads its settings at import time, so point it at a scratch database first.
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["SMTP_HOST"] = ""
+os.environ["OUTBOX_WORKER"] = "off"
+os.environ["ADMIN_PASSWORD"] = "pw"
+os.environ["INTAKE_API_TOKEN"] = "test-token"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as enrollment  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    enrollment.init_app()
+    return enrollment.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def form():
+    """A complete, valid enrollment form."""
+    return {
+        "school": "kuban", "first_name": "Ana", "last_name": "López", "dob": "2018-05-01", "sex": "female",
+        "address1": "100 Main St", "city": "Phoenix", "state": "AZ", "zip": "85009",
+        "parent_name": "Maria López", "parent_cell": "602-555-0100", "typed_signature": "Maria López", "agree": "1",
+    }
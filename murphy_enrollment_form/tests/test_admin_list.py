@@ -0,0 +1,35 @@
+import pytest
+
+import app as enrollment
+
+
+def listed(client, q):
+    resp = client.get("/admin", query_string={"q": q, "pw": "pw"})
+    assert resp.status_code == 200
+    return resp.get_data(as_text=True)
+
+
+def test_name_filter_ignores_accents_and_case(client, form):
+    resp = client.post("/enroll?lang=en", data={
+        **form, "first_name": "Zoë", "last_name": "Núñez", "parent_email": "m@example.org",
+    })
+    assert resp.status_code == 302
+    assert "Núñez" in listed(client, "Nunez")
+    assert "Núñez" in listed(client, "núñ")
+    assert "Núñez" in listed(client, "nunez, zoe")
+    assert "Núñez" in listed(client, "zoe")
+    assert "Núñez" not in listed(client, "Nunez, Ana")
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"form_lang": "es"}, "idx_submissions_lang"),
+    ({"school": "kuban"}, "idx_submissions_school"),
+    ({"q": "nunez, zoe"}, "idx_submissions_folded_name"),
+])
+def test_filters_seek_on_an_index(app, filters, index):
+    clauses, params = enrollment.admin_where(filters)
+    with enrollment.POOL.connection() as conn:
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM submissions WHERE {' AND '.join(clauses)} ORDER BY id DESC", params,
+        ))
+    assert f"INDEX {index} " in plan
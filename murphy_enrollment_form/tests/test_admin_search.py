@@ -0,0 +1,12 @@
+def search(client, q):
+    resp = client.get("/admin/search", query_string={"q": q, "pw": "pw"})
+    assert resp.status_code == 200
+    return [r["submission_id"] for r in resp.get_json()["results"]]
+
+
+def test_new_submission_is_found_by_its_id(client, form):
+    resp = client.post("/enroll?lang=en", data={**form, "first_name": "Searchable", "parent_email": "maria@example.org"})
+    assert resp.status_code == 302
+    submission_id = resp.headers["Location"].split("/success/")[1].split("?")[0]
+    assert search(client, submission_id) == [submission_id]
+    assert submission_id in search(client, "Searchable")
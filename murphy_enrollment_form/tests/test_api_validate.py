@@ -0,0 +1,71 @@
+import pytest
+
+import app as enrollment
+
+
+def validate(client, body):
+    resp = client.post("/api/validate", json=body)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_valid_form(client, form):
+    assert validate(client, form) == {"ok": True, "errors": {}}
+
+
+def test_missing_required_fields(client):
+    errors = validate(client, {})["errors"]
+    assert errors["first_name"]["code"] == "required"
+    assert errors["agree"]["code"] == "required"
+
+
+@pytest.mark.parametrize("race", [5, [["x"]], [{"a": 1}], {"a": 1}, ["white", None]])
+def test_race_of_wrong_shape_is_invalid(client, form, race):
+    errors = validate(client, {**form, "race": race})["errors"]
+    assert errors["race"]["code"] == "invalid"
+
+
+def test_race_list(client, form):
+    assert validate(client, {**form, "race": ["white", "asian"]})["ok"]
+
+
+@pytest.mark.parametrize("count", [[2], {"n": 2}])
+def test_sibling_count_of_wrong_shape_is_invalid(client, form, count):
+    body = {**form, "has_murphy_siblings": "yes", "sibling_count": count}
+    errors = validate(client, body)["errors"]
+    assert errors["sibling_count"]["code"] == "invalid"
+
+
+@pytest.mark.parametrize("value", [{"a": 1}, ["Ana"]])
+def test_text_field_rejects_non_scalar(client, form, value):
+    errors = validate(client, {**form, "first_name": value})["errors"]
+    assert errors["first_name"]["code"] == "invalid"
+
+
+def test_intake_api_reports_wrong_shapes_per_item(client, form):
+    resp = client.post(
+        "/api/submissions",
+        json=[{**form, "race": 5}, {**form, "has_murphy_siblings": "yes", "sibling_count": [2]}],
+        headers={"Authorization": "Bearer test-token"},
+    )
+    assert resp.status_code == 422
+    results = resp.get_json()["results"]
+    assert results[0]["errors"]["race"]["code"] == "invalid"
+    assert results[1]["errors"]["sibling_count"]["code"] == "invalid"
+
+
+def test_json_booleans_set_flags(client, form):
+    assert validate(client, {**form, "agree": True, "sped": True, "gifted": False})["ok"]
+    errors = validate(client, {**form, "agree": False})["errors"]
+    assert errors["agree"]["code"] == "required"
+
+
+def test_json_numbers_for_int_fields(client, form):
+    body = {**form, "has_murphy_siblings": "yes", "sibling_count": 1, "sibling1_name": "Luis"}
+    assert validate(client, body)["ok"]
+
+
+def test_json_boolean_flags_are_stored(form):
+    clean, errors = enrollment.validate_form({**form, "agree": True, "sped": True})
+    assert not errors
+    assert clean["agree"] == clean["sped"] == "1"
@@ -0,0 +1,43 @@
+import uuid
+from urllib.parse import urlsplit
+
+import app as enrollment
+
+
+def enroll(client, form, **fields):
+    resp = client.post("/enroll?lang=en", data={
+        **form, "parent_email": "m@example.org", "submission_token": uuid.uuid4().hex, **fields,
+    })
+    assert resp.status_code == 302
+    return urlsplit(resp.headers["Location"]).path.rsplit("/", 1)[-1]
+
+
+def stored(submission_id):
+    with enrollment.POOL.connection() as conn:
+        return conn.execute(
+            "SELECT count(*) AS n, max(duplicate_of) AS duplicate_of FROM submissions WHERE submission_id = ?",
+            (submission_id,),
+        ).fetchone()
+
+
+def test_token_replay_returns_the_original(client, form):
+    token = uuid.uuid4().hex
+    first = enroll(client, form, first_name="Replay", submission_token=token)
+    assert enroll(client, form, first_name="Replay", submission_token=token) == first
+    assert stored(first)["n"] == 1
+
+
+def test_same_student_is_stored_and_flagged(client, form):
+    first = enroll(client, form, first_name="Twice", last_name="Ruiz")
+    second = enroll(client, form, first_name="twice", last_name="Ruíz")
+    assert second != first
+    assert stored(first)["duplicate_of"] is None
+    assert stored(second)["duplicate_of"] == first
+    page = client.get("/admin", query_string={"q": "ruiz, twice", "pw": "pw"}).get_data(as_text=True)
+    assert f"Same student as {first}" in page
+
+
+def test_identity_check_off_with_zero_window(client, form, monkeypatch):
+    monkeypatch.setattr(enrollment, "DUPLICATE_WINDOW_DAYS", 0)
+    enroll(client, form, first_name="Once", last_name="Soto")
+    assert stored(enroll(client, form, first_name="Once", last_name="Soto"))["duplicate_of"] is None
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+import pytest
+
+import app as enrollment
+
+
+def legacy_row(**payload):
+    """A submissions row whose payload uses the column names as keys (the original layout)."""
+    columns = {
+        "school": "kuban", "student_first": "Ana", "student_last": "López", "dob": "2018-05-01",
+        "parent_name": "Maria López", "parent_email": "maria@example.org", "parent_phone": "(602) 555-0100",
+    }
+    row = {"submission_id": "MUR-2025-00001", "created_at": "2025-07-01T08:00:00", "lang": "es", **columns}
+    row["payload_json"] = json.dumps({**columns, "sex": "female", **payload})
+    return row
+
+
+def test_synergy_record_reads_identity_from_columns():
+    record = dict(zip(enrollment.SYNERGY_HEADER, enrollment.synergy_record(legacy_row())))
+    assert record["Last Name"] == "López"
+    assert record["First Name"] == "Ana"
+    assert record["Birth Date"] == "05/01/2018"
+    assert record["Parent/Guardian Name"] == "Maria López"
+    assert record["Parent/Guardian Phone"] == "602-555-0100"
+    assert record["Parent/Guardian Email"] == "maria@example.org"
+
+
+def test_synergy_export_of_a_new_submission(client, form):
+    resp = client.post("/enroll?lang=en", data={**form, "first_name": "Exported", "parent_email": "m@example.org"})
+    assert resp.status_code == 302
+    rows = list(csv.DictReader(io.StringIO(client.get("/admin/export-synergy.csv?pw=pw").get_data(as_text=True))))
+    row = next(r for r in rows if r["First Name"] == "Exported")
+    assert row["Last Name"] == "López"
+    assert row["Parent/Guardian Phone"] == "602-555-0100"
+
+
+def test_export_commands_write_new_rows_only(app, client, form, tmp_path):
+    client.post("/enroll?lang=en", data={**form, "first_name": "Cli", "parent_email": "m@example.org"})
+    runner = app.test_cli_runner()
+    out = tmp_path / "synergy.csv"
+    result = runner.invoke(args=["export-synergy", "--out", str(out), "--workers", "1"])
+    assert result.exit_code == 0, result.output
+    upto = int(result.output.rsplit("--since-id ", 1)[1].rstrip(".\n"))
+    assert "Cli" in out.read_text(encoding="utf-8")
+
+    result = runner.invoke(args=["export-synergy", "--out", str(out), "--since-id", str(upto), "--workers", "1"])
+    assert result.output.startswith("Wrote 0 row(s)")
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_export_parquet_command(app, client, form, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    client.post("/enroll?lang=en", data={**form, "first_name": "Columnar", "parent_email": "m@example.org"})
+    out = tmp_path / "enrollment.parquet"
+    result = app.test_cli_runner().invoke(args=["export-parquet", "--out", str(out)])
+    assert result.exit_code == 0, result.output
+    table = pq.read_table(out, columns=["first_name", "dob", "agree"])
+    assert "Columnar" in table.column("first_name").to_pylist()
+    assert table.schema.field("agree").type == "bool"
+
+
+def test_parquet_row_reads_identity_from_columns():
+    pytest.importorskip("pyarrow")
+    names = [f.name for f in enrollment.PARQUET_FIELDS]
+    row = legacy_row()
+    values = dict(zip(["submission_id", "received_at", "lang", *names], enrollment.parquet_row(row, None)))
+    assert values["first_name"] == "Ana"
+    assert values["last_name"] == "López"
+    assert str(values["dob"]) == "2018-05-01"
+    assert values["parent_cell"] == "(602) 555-0100"
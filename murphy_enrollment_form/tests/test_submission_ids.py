@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+import app as enrollment
+
+YEAR = 1999  # a counter no other test touches
+
+
+def test_rolled_back_block_is_never_handed_out(app, monkeypatch):
+    monkeypatch.setattr(enrollment.ID_ALLOCATOR, "block_size", 5)
+    issued = []
+
+    def allocate(conn):
+        return enrollment.ID_ALLOCATOR.allocate(conn, YEAR)
+
+    def allocate_elsewhere():
+        with enrollment.POOL.connection() as conn:
+            issued.append(enrollment.run_write(conn, allocate))
+
+    other = threading.Thread(target=allocate_elsewhere)
+
+    def reserve_then_fail(conn):
+        allocate(conn)  # reserves a fresh block inside this transaction
+        other.start()
+        other.join(0.2)  # give the other thread every chance to take an ID from that block
+        raise RuntimeError("insert failed")
+
+    with enrollment.POOL.connection() as conn:
+        with pytest.raises(RuntimeError):
+            enrollment.run_write(conn, reserve_then_fail)
+        other.join()
+        issued += [enrollment.run_write(conn, allocate) for _ in range(12)]
+
+    assert len(set(issued)) == len(issued)
@@ -0,0 +1,10 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py                     # Linux
+    waitress-serve --threads 8 wsgi:application      # Windows
+
+app.py holds one app per process; init_app() migrates the database and returns it.
+"""
+from app import init_app
+
+application = app = init_app()